@@ -0,0 +1,99 @@
+"""
+Loading answer -> question / event -> tg_user objects graph:
+    a single query with recursive joins (`join_depth=2`) vs separate query per referenced row.
+
+Needs DB (see `PG_*` env vars of `orm/base.py`).
+Run: PYTHONPATH="./" python src/benchmarks/fk_joins.py
+"""
+
+import functools
+import os
+import time
+
+from src.orm import base
+from src.orm.base import In
+from src.tables.answer import (
+    AnswerDB,
+    AnswerType,
+)
+from src.tables.event import (
+    EventDB,
+)
+from src.tables.question import (
+    QuestionDB,
+)
+from src.tables.tg_user import (
+    TgUserDB,
+)
+
+# Separate queries are slow, so only so many answers are loaded
+BENCH_ANSWERS_LIMIT = int(os.environ.get("BENCH_ANSWERS_LIMIT", "300"))
+
+
+def load_joined(pks: list[int]) -> list[AnswerDB]:
+    return AnswerDB.select(
+        join_on_fkeys=True, join_depth=2, where_clauses=In(AnswerDB.column("pk"), pks)
+    )
+
+
+def load_separately(pks: list[int]) -> list[AnswerDB]:
+    """
+    Answers are selected without joins, then each referenced row by its own query
+    """
+    answers = AnswerDB.select(where_clauses=In(AnswerDB.column("pk"), pks))
+
+    def select_one(class_, column_name, value):
+        return class_.select(where_clauses={class_.column(column_name): value})[0]
+
+    for answer in answers:
+        for fkey, fk_value in (
+            (AnswerType.QUESTION.value, answer.question_fk),
+            (AnswerType.EVENT.value, answer.event_fk),
+        ):
+            if fk_value is None:
+                answer.set_fk_value(fkey, None)
+                continue
+
+            obj: QuestionDB | EventDB = select_one(fkey.class_, fkey.other_column, fk_value)
+            user = select_one(TgUserDB, "user_id", obj.user_id) if obj.user_id is not None else None
+
+            obj.set_fk_value(obj.ForeignKeys.USER_ID.value, user)
+            answer.set_fk_value(fkey, obj)
+
+    return answers
+
+
+def measure(func) -> tuple[float, int]:
+    queries_before = sum(x.calls for x in base.query_stats.shapes.values())
+
+    start = time.perf_counter()
+    func()
+    duration = time.perf_counter() - start
+
+    queries_count = sum(x.calls for x in base.query_stats.shapes.values()) - queries_before
+    return duration, queries_count
+
+
+def main():
+    # Both ways load the same answers
+    pks = sorted(AnswerDB.select_pks())[:BENCH_ANSWERS_LIMIT]
+
+    # Warm up: pool connections, prepared statements
+    load_joined(pks)
+    load_separately(pks)
+
+    joined_time, joined_queries = measure(functools.partial(load_joined, pks))
+    separate_time, separate_queries = measure(functools.partial(load_separately, pks))
+
+    print(f"Loading {len(pks)} answers with questions/events & their users:")
+    print(f"  joined (depth=2) : {joined_time * 1000:8.1f} ms, {joined_queries} queries")
+    print(
+        f"  separate queries : {separate_time * 1000:8.1f} ms, {separate_queries} queries"
+        f"  (x{separate_time / joined_time:.1f} slower)"
+    )
+
+    base.close_pool()
+
+
+if __name__ == "__main__":
+    main()
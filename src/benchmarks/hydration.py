@@ -0,0 +1,182 @@
+"""
+`Table.select` rows -> objects hydration benchmark (no DB needed: rows are generated).
+
+Run: PYTHONPATH="./" python src/benchmarks/hydration.py
+"""
+
+import datetime
+import random
+import timeit
+
+from src.orm.base import ColumnDC
+from src.orm.dataclasses import (
+    BackForeignKey,
+    ForeignKey,
+    Table,
+    _select_plan,
+)
+from src.orm.identity_map import (
+    IdentityMap,
+)
+from src.tables.answer import (
+    AnswerDB,
+)
+
+ROWS_COUNT = 100_000
+QUESTIONS_COUNT = 30
+EVENTS_COUNT = 30
+REPEATS = 5
+
+
+def gen_rows(rows_count: int) -> list[tuple]:
+    """
+    Rows as selected by `AnswerDB.select_all`: answer, question, event columns
+    """
+    rows: list[tuple] = []
+    first_day = datetime.date(2020, 1, 1)
+    updated_at = datetime.datetime(2020, 1, 1)
+
+    for pk in range(rows_count):
+        day = first_day + datetime.timedelta(days=pk // 40)
+        time = datetime.time(hour=random.randint(0, 23))  # nosec B311
+
+        if pk % 2:
+            question_pk = pk % QUESTIONS_COUNT
+            answer = (pk, day, None, question_pk, time, str(pk), updated_at)
+            question = (
+                question_pk,
+                1,
+                f"q{question_pk}",
+                "text",
+                ["1", "2"],
+                True,
+                1,
+                0,
+                updated_at,
+            )
+            event = (None,) * 6
+        else:
+            event_pk = pk % EVENTS_COUNT
+            answer = (pk, day, event_pk, None, time, "start", updated_at)
+            question = (None,) * 9
+            event = (event_pk, 1, f"e{event_pk}", "1", "durable", updated_at)
+
+        rows.append(answer + question + event)
+
+    return rows
+
+
+def legacy_hydrate(cls: type[Table], rows: list[tuple]) -> list[Table]:
+    """
+    Hydration as it was before per-class plans: copy of former `Table.select` rows loop
+    """
+
+    def create_dataclass_instance(class_to_create, columns_list, values_list):
+        value_apply = lambda x: tuple(x) if isinstance(x, list) else x  # noqa: E731
+
+        return class_to_create(
+            **{
+                columns_list[i].column_name: value_apply(values_list[i])
+                for i in range(len(columns_list))
+            }
+        )
+
+    primary_tablename = cls.Meta.tablename
+    auxiliary_table_fk_mapping = {}
+    auxiliary_table_columns_mapping = {
+        primary_tablename: [
+            ColumnDC(table_name=primary_tablename, column_name=x) for x in cls.__slots__
+        ]
+    }
+    for fk_dataclass in cls.foreign_keys():
+        join_table_name = fk_dataclass.class_.Meta.tablename
+        auxiliary_table_fk_mapping[join_table_name] = fk_dataclass
+        auxiliary_table_columns_mapping[join_table_name] = [
+            ColumnDC(table_name=join_table_name, column_name=x)
+            for x in fk_dataclass.class_.__slots__
+        ]
+
+    objs_dict = {}
+    for row in rows:
+        primary_table_obj = None
+
+        offset = 0
+        for table in auxiliary_table_columns_mapping:
+            table_selected_columns = auxiliary_table_columns_mapping[table]
+            columns_count = len(table_selected_columns)
+            values_for_table = row[offset : offset + columns_count]
+
+            if table == primary_tablename:
+                primary_table_obj = create_dataclass_instance(
+                    cls, table_selected_columns, values_for_table
+                )
+                hash_int = primary_table_obj.__hash__()
+                if hash_int in objs_dict:
+                    primary_table_obj = objs_dict[hash_int]
+                else:
+                    objs_dict[hash_int] = primary_table_obj
+            else:
+                fk_obj = auxiliary_table_fk_mapping[table]
+                if primary_table_obj.__getattribute__(fk_obj.my_column) is None:
+                    new_dataclass_obj = None
+                else:
+                    new_dataclass_obj = create_dataclass_instance(
+                        fk_obj.class_, table_selected_columns, values_for_table
+                    )
+
+                if isinstance(fk_obj, BackForeignKey):
+                    primary_table_obj.set_back_fk_value(fk_obj, new_dataclass_obj)
+                elif isinstance(fk_obj, ForeignKey):
+                    primary_table_obj.set_fk_value(fk_obj, new_dataclass_obj)
+
+            offset += columns_count
+
+    return list(objs_dict.values())
+
+
+def plan_hydrate(cls: type[Table], rows: list[tuple], weak: bool = False) -> list[Table]:
+    """
+    Same loop as in `Table.select`
+    """
+    plan = _select_plan(cls, True)
+
+    objs_dict = {}
+    identity_map = IdentityMap(weak=weak)
+
+    hydrate_row = plan.hydrate_row
+    for row in rows:
+        hydrate_row(row, objs_dict, identity_map)
+
+    return list(objs_dict.values())
+
+
+def main():
+    random.seed(0)
+    rows = gen_rows(ROWS_COUNT)
+
+    legacy_objs = legacy_hydrate(AnswerDB, rows)
+    plan_objs = plan_hydrate(AnswerDB, rows)
+
+    # Same objects, with the same foreign keys values
+    assert legacy_objs == plan_objs
+    assert all(
+        legacy.question == new.question and legacy.event == new.event
+        for legacy, new in zip(legacy_objs, plan_objs)
+    )
+
+    legacy_time = min(
+        timeit.repeat(lambda: legacy_hydrate(AnswerDB, rows), number=1, repeat=REPEATS)
+    )
+    plan_time = min(timeit.repeat(lambda: plan_hydrate(AnswerDB, rows), number=1, repeat=REPEATS))
+    weak_time = min(
+        timeit.repeat(lambda: plan_hydrate(AnswerDB, rows, weak=True), number=1, repeat=REPEATS)
+    )
+
+    print(f"Hydrating {ROWS_COUNT} answer rows (+ question, event), best of {REPEATS}:")
+    print(f"  legacy  : {legacy_time * 1000:8.1f} ms")
+    print(f"  plan    : {plan_time * 1000:8.1f} ms  (x{legacy_time / plan_time:.1f} faster)")
+    print(f"  plan + weak identity map : {weak_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
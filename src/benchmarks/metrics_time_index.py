@@ -0,0 +1,166 @@
+"""
+Generated metrics over `UserDBCache` time index vs scan of all answers (no DB needed: answers are generated).
+
+Run: PYTHONPATH="./" python src/benchmarks/metrics_time_index.py
+"""
+
+import datetime
+import random
+import timeit
+
+from src.generated_metrics import (
+    AT_BED_EVENT_PK,
+    SLEEP_DEFAULT_KWARGS,
+    SLEEP_EVENT_PK,
+    CumulativeDurationGenMetric,
+    GeneratedMetricEvent,
+    GeneratedMetricsEnum,
+    build_first_occurrence_metric,
+)
+from src.tables.answer import (
+    AnswerDB,
+    AnswerType,
+)
+from src.tables.event import (
+    EventDB,
+)
+from src.user_data import (
+    UserDBCache,
+)
+
+DAYS_COUNT = 365
+# Other events, answered during the day
+OTHER_EVENTS_COUNT = 30
+# Share of other events answered each day
+ANSWERED_RATIO = 0.7
+REPEATS = 3
+
+
+def gen_cache(days_count: int) -> UserDBCache:
+    """
+    Cache with sleep / at bed periods every night, and other events answered during the day
+    """
+    updated_at = datetime.datetime(2020, 1, 1)
+    first_day = datetime.date(2020, 1, 1)
+
+    def event(pk: int, name: str) -> EventDB:
+        return EventDB(
+            pk=pk, user_id=1, name=name, order_by=str(pk), type="", updated_at=updated_at
+        )
+
+    events = [event(AT_BED_EVENT_PK, "at bed"), event(SLEEP_EVENT_PK, "sleep")]
+    # Matched by the same name (without emoji)
+    events += [event(100, "😴 nap"), event(101, "nap")]
+    events += [event(pk, f"event {pk}") for pk in range(OTHER_EVENTS_COUNT)]
+
+    answers: list[AnswerDB] = []
+
+    def add_answer(event_db: EventDB, at: datetime.datetime, text: str) -> None:
+        answer = AnswerDB(
+            pk=len(answers),
+            date=at.date(),
+            event_fk=event_db.pk,
+            question_fk=None,
+            time=at.time(),
+            text=text,
+            updated_at=updated_at,
+        )
+        answer.set_fk_value(AnswerType.EVENT.value, event_db)
+        answers.append(answer)
+
+    def minutes(start_hour: int, end_hour: int) -> datetime.timedelta:
+        random_minutes = random.randint(start_hour * 60, end_hour * 60)  # nosec B311
+        return datetime.timedelta(minutes=random_minutes)
+
+    for day_i in range(days_count):
+        day = first_day + datetime.timedelta(days=day_i)
+        day_start = datetime.datetime.combine(day, datetime.time())
+
+        for event_db in events[2:]:
+            if random.random() > ANSWERED_RATIO:  # nosec B311
+                continue
+
+            at = day_start + minutes(8, 20)
+            add_answer(event_db, at, "start")
+            add_answer(event_db, at + datetime.timedelta(minutes=30), "end")
+
+        bed_at = day_start + minutes(22, 25)
+        sleep_at = bed_at + minutes(0, 1)
+        awake_at = sleep_at + minutes(6, 9)
+        add_answer(events[0], bed_at, "start")
+        add_answer(events[1], sleep_at, "start")
+        add_answer(events[1], awake_at, "end")
+        add_answer(events[0], awake_at + datetime.timedelta(minutes=10), "end")
+
+    answers.sort(key=AnswerDB.sort_key)
+
+    return UserDBCache.from_rows(questions=[], events=events, answers=answers)
+
+
+def legacy_value_on_day(
+    metric: GeneratedMetricEvent, all_answers: list[AnswerDB], on_day: datetime.date
+):
+    """
+    Scan of all answers, as it was before
+    """
+    day_start = datetime.datetime.combine(date=on_day, time=datetime.time.min)
+    start_dt = day_start + metric.custom_dt_start_add
+    end_dt = day_start + datetime.timedelta(days=1) + metric.custom_dt_end_add
+
+    def match_answer(answer: AnswerDB) -> bool:
+        if answer.event:
+            if metric.target_event_id:
+                return metric.target_event_id == answer.event.pk
+            return metric.target_event_name == answer.event.ascii_lower_name()
+        return False
+
+    target_answers = [
+        x for x in all_answers if start_dt < x.get_timestamp() < end_dt and match_answer(x)
+    ]
+
+    return metric._value_on_target_answers(target_answers)
+
+
+def main():
+    random.seed(0)
+
+    cache = gen_cache(DAYS_COUNT)
+    days = sorted(cache.answers_by_day)
+
+    metrics: list[GeneratedMetricEvent] = [
+        x.value for x in GeneratedMetricsEnum if isinstance(x.value, GeneratedMetricEvent)
+    ]
+    metrics += [
+        build_first_occurrence_metric(target_event_name="nap", name="nap"),
+        CumulativeDurationGenMetric(target_event_name="nap", name="nap", **SLEEP_DEFAULT_KWARGS),
+    ]
+
+    for metric in metrics:
+        for day in days:
+            assert metric.value_on_day(cache, day) == legacy_value_on_day(
+                metric, cache.answers, day
+            )
+
+    def run_legacy():
+        for day in days:
+            for metric in metrics:
+                legacy_value_on_day(metric, cache.answers, day)
+
+    def run_indexed():
+        for day in days:
+            for metric in metrics:
+                metric.value_on_day(cache, day)
+
+    legacy_time = min(timeit.repeat(run_legacy, number=1, repeat=REPEATS))
+    indexed_time = min(timeit.repeat(run_indexed, number=1, repeat=REPEATS))
+
+    print(
+        f"{len(metrics)} generated metrics on {len(days)} days of {len(cache.answers)} answers, "
+        f"best of {REPEATS}:"
+    )
+    print(f"  scan    : {legacy_time * 1000:9.1f} ms")
+    print(f"  indexed : {indexed_time * 1000:9.1f} ms  (x{legacy_time / indexed_time:.1f} faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+`UserDBCache.questions_answers_df` pivot benchmark (no DB needed: answers are generated).
+
+Run: PYTHONPATH="./" python src/benchmarks/questions_pivot.py
+"""
+
+import datetime
+import random
+import timeit
+import warnings
+
+import pandas as pd
+
+from src.tables.answer import (
+    AnswerDB,
+    AnswerType,
+)
+from src.tables.question import (
+    QuestionDB,
+)
+from src.user_data import (
+    UserDBCache,
+)
+
+DAYS_COUNT = 3 * 365
+QUESTIONS_COUNT = 30
+# Share of (day, question) pairs answered
+ANSWERED_RATIO = 0.7
+REPEATS = 5
+
+
+def gen_cache(days_count: int) -> UserDBCache:
+    """
+    Cache with daily answers on questions (some of them empty, some days without text at all)
+    """
+    updated_at = datetime.datetime(2020, 1, 1)
+    first_day = datetime.date(2020, 1, 1)
+
+    questions = [
+        QuestionDB(
+            pk=pk,
+            user_id=1,
+            name=f"question {pk}",
+            fulltext="",
+            choices_list=None,
+            is_activated=True,
+            order_by=pk,
+            type_id=0,
+            updated_at=updated_at,
+        )
+        for pk in range(QUESTIONS_COUNT)
+    ]
+
+    answers: list[AnswerDB] = []
+    for day_i in range(days_count):
+        day = first_day + datetime.timedelta(days=day_i)
+        is_empty_day = day_i % 50 == 0
+
+        for question in questions:
+            if random.random() > ANSWERED_RATIO:  # nosec B311
+                continue
+
+            answer = AnswerDB(
+                pk=len(answers),
+                date=day,
+                event_fk=None,
+                question_fk=question.pk,
+                time=None,
+                text=None if is_empty_day or random.random() < 0.05 else str(day_i),  # nosec B311
+                updated_at=updated_at,
+            )
+            answer.set_fk_value(AnswerType.QUESTION.value, question)
+            answers.append(answer)
+
+    return UserDBCache.from_rows(questions=questions, events=[], answers=answers)
+
+
+def legacy_questions_answers_df(
+    cache: UserDBCache, include_empty_cols: bool = False
+) -> pd.DataFrame | None:
+    """
+    Column by column version, as it was before
+    """
+    index = cache.questions_names()
+
+    df = pd.DataFrame(index=index)
+
+    # <day (date)> : tuple(<question_name>, <answer_text>)
+    day_answers_mapping: dict[datetime.date, list[tuple[str, str]]] = {}
+
+    for answer in cache.answers:
+        # One of QuestionDB / EventDB
+
+        if answer.question:
+            if not day_answers_mapping.get(answer.date, None):
+                day_answers_mapping[answer.date] = []
+
+            answer_text = answer.text
+            day_answers_mapping[answer.date].append((answer.question.name, answer_text))
+
+    if not day_answers_mapping:
+        return None
+
+    for day in day_answers_mapping:
+        qnames_and_texts = day_answers_mapping[day]
+        day_col = pd.DataFrame(qnames_and_texts).set_index(0)
+
+        if not include_empty_cols:
+            if day_col.isnull().all().bool():
+                continue
+
+        df[day] = day_col
+
+    return df
+
+
+def main():
+    random.seed(0)
+    # Legacy version is warned about fragmenting the frame on each run
+    warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+
+    cache = gen_cache(DAYS_COUNT)
+
+    for include_empty_cols in False, True:
+        legacy_df = legacy_questions_answers_df(cache, include_empty_cols)
+        pivot_df = cache._build_questions_answers_df(include_empty_cols)
+
+        # Same cells (None / NaN included), labels & order
+        pd.testing.assert_frame_equal(legacy_df, pivot_df)
+
+    legacy_time = min(
+        timeit.repeat(lambda: legacy_questions_answers_df(cache), number=1, repeat=REPEATS)
+    )
+    pivot_time = min(
+        timeit.repeat(lambda: cache._build_questions_answers_df(False), number=1, repeat=REPEATS)
+    )
+
+    print(
+        f"Questions by day table of {len(cache.answers)} answers "
+        f"({DAYS_COUNT} days x {QUESTIONS_COUNT} questions), best of {REPEATS}:"
+    )
+    print(f"  legacy : {legacy_time * 1000:8.1f} ms")
+    print(f"  pivot  : {pivot_time * 1000:8.1f} ms  (x{legacy_time / pivot_time:.1f} faster)")
+
+
+if __name__ == "__main__":
+    main()
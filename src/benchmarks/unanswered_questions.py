@@ -0,0 +1,113 @@
+"""
+"Unanswered" questions selection: `UserDBCache.answered_questions` matrix vs filtering of pivot table
+    (no DB needed: answers are generated).
+
+Run: PYTHONPATH="./" python src/benchmarks/unanswered_questions.py
+"""
+
+import datetime
+import random
+import timeit
+
+import numpy as np
+
+from src.benchmarks.questions_pivot import (
+    DAYS_COUNT,
+    QUESTIONS_COUNT,
+    gen_cache,
+)
+from src.tables.answer import (
+    AnswerDB,
+    AnswerType,
+)
+from src.user_data import (
+    UserDBCache,
+)
+
+REPEATS = 5
+
+
+def legacy_unanswered_indices(cache: UserDBCache, day: datetime.date) -> list[int]:
+    """
+    Nulls of day column of pivot table, as it was before (empty result means "no day in table")
+    """
+    answers_df = cache._build_questions_answers_df(False)
+    if answers_df is None or day not in answers_df.columns:
+        return list(range(len(cache.questions)))
+
+    return list(
+        answers_df[day]
+        .isnull()
+        .reset_index()
+        .drop("index", axis=1)
+        .apply(lambda x: None if bool(x[0]) is False else 1, axis=1)
+        .dropna()
+        .index
+    )
+
+
+def check_same(cache: UserDBCache, days: list[datetime.date]) -> None:
+    for day in days:
+        assert cache.unanswered_questions_indices(day) == legacy_unanswered_indices(cache, day)
+
+
+def main():
+    random.seed(0)
+
+    cache = gen_cache(DAYS_COUNT)
+
+    days = sorted(cache.answers_by_day)
+    # Today, not answered yet
+    days.append(days[-1] + datetime.timedelta(days=1))
+
+    check_same(cache, random.sample(days, 20) + days[-2:])
+
+    # Incremental updates (new day, overwritten answers, answers without text) give the same matrix
+    question = cache.questions[3]
+    for i, (day, text) in enumerate(((days[-1], "new"), (days[0], None), (days[5], "changed"))):
+        old = cache.question_answer_on(day, question.pk)
+        answer = AnswerDB(
+            pk=old.pk if old else len(cache.answers) + i,
+            date=day,
+            event_fk=None,
+            question_fk=question.pk,
+            time=None,
+            text=text,
+            updated_at=datetime.datetime(2020, 1, 1),
+        )
+        answer.set_fk_value(AnswerType.QUESTION.value, question)
+        cache.add_answers([answer])
+
+    incremental = cache.answered_questions
+    cache._update_answers_indexes()
+    for day in days:
+        assert np.array_equal(
+            incremental.answered_on(day), cache.answered_questions.answered_on(day)
+        )
+    check_same(cache, [days[-1], days[0], days[5]])
+
+    day = days[len(days) // 2]
+    legacy_time = min(
+        timeit.repeat(lambda: legacy_unanswered_indices(cache, day), number=1, repeat=REPEATS)
+    )
+    matrix_time = (
+        min(
+            timeit.repeat(
+                lambda: cache.unanswered_questions_indices(day), number=1000, repeat=REPEATS
+            )
+        )
+        / 1000
+    )
+
+    print(
+        f"Unanswered questions on a day, {len(cache.answers)} answers "
+        f"({DAYS_COUNT} days x {QUESTIONS_COUNT} questions), best of {REPEATS}:"
+    )
+    print(f"  pivot + filter : {legacy_time * 1000:9.3f} ms")
+    print(
+        f"  matrix         : {matrix_time * 1000:9.3f} ms  (x{legacy_time / matrix_time:.0f} faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
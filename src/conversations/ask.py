@@ -3,7 +3,6 @@ import logging
 import re
 import time
 
-import pandas as pd
 import telegram
 from telegram import Update
 from telegram.constants import (
@@ -198,7 +197,6 @@ async def on_chosen_question_name_option(  # noqa: C901
     send_text_func = update.effective_chat.send_message
 
     # qnames = ud.db_cache.questions_names()
-    answers_df: pd.DataFrame = ud.db_cache.questions_answers_df()
 
     await update.callback_query.answer()
     query: str = update.callback_query.data
@@ -255,24 +253,9 @@ async def on_chosen_question_name_option(  # noqa: C901
     elif query == SelectQuestionCallback.ALL:
         include_indices = all_indices
     elif query == SelectQuestionCallback.UNANSWERED:
-        if answers_df is not None:
-            if ud.conv_storage.day not in answers_df.columns:
-                include_indices = all_indices
-            else:
-                # Filter to get indices of only null values
-                include_indices = list(
-                    answers_df[ud.conv_storage.day]
-                    .isnull()
-                    .reset_index()
-                    .drop("index", axis=1)
-                    .apply(lambda x: None if bool(x[0]) is False else 1, axis=1)
-                    .dropna()
-                    .index
-                )
+        include_indices = ud.db_cache.unanswered_questions_indices(ud.conv_storage.day)
 
-                if len(include_indices) == 0:
-                    include_indices = all_indices
-        else:
+        if len(include_indices) == 0:
             include_indices = all_indices
     elif query == SelectQuestionCallback.CLEAR:
         include_indices = []
@@ -1,6 +1,8 @@
+import asyncio
 import collections
 import copy
 import datetime
+import logging
 from io import BytesIO
 from typing import Callable
 
@@ -44,10 +46,10 @@ from src.generated_metrics import (
 from src.orm.base import (
     ColumnDC,
     ValueType,
-    _insert_row,
-    update_or_insert_row,
+    in_transaction,
 )
 from src.tables.answer import (
+    AnswerDB,
     AnswerType,
 )
 from src.tables.event import (
@@ -75,6 +77,8 @@ from src.utils_tg import (
     wrapped_send_text,
 )
 
+logger = logging.getLogger(__name__)
+
 
 async def remove_keyboard(update: Update, msg_text: str):
     await update.message.reply_text(text=msg_text, reply_markup=ReplyKeyboardRemove())
@@ -180,7 +184,12 @@ def insert_event_answer(
     day: datetime.date | None,
     time: datetime.time | None,
     text: str | None,
-):
+) -> AnswerDB:
+    """
+    Inserted answer is needed at once (to be written through to cache), so it can't be deferred
+    """
+    assert not in_transaction(), "Event answer insert can't be deferred by transaction()"
+
     row_dict: dict[ColumnDC, ValueType] = {
         ColumnDC(column_name="date"): day,
         ColumnDC(column_name="event_fk"): event.pk,
@@ -192,7 +201,7 @@ def insert_event_answer(
     if text:
         row_dict[ColumnDC(column_name="text")] = text
 
-    _insert_row(tablename="answer", row_dict=row_dict)
+    return AnswerDB.insert(row_dict)
 
 
 async def send_ask_question(q: QuestionDB, send_text_func: Callable, existing_answer: str = None):
@@ -394,6 +403,9 @@ async def on_end_asking_questions(
 
         answers = ud.conv_storage.cur_answers
 
+        rows: list[tuple[dict[ColumnDC, ValueType], dict[ColumnDC, ValueType]]] = []
+        rows_questions: list[QuestionDB] = []
+
         # TODO: mb make as only str
         question_answer: str | int | float | datetime.time | datetime.datetime
         for i, question_answer in enumerate(answers):
@@ -413,19 +425,29 @@ async def on_end_asking_questions(
                 event_answer_time = get_now_time()
                 set_dict[ColumnDC(column_name="time")] = event_answer_time
 
-            update_or_insert_row(
-                tablename="answer",
-                where_clauses={
-                    ColumnDC(column_name="date"): day,
-                    ColumnDC(column_name="question_fk"): question.pk,
-                },
-                set_dict=set_dict,
+            where_clauses = {
+                ColumnDC(column_name="date"): day,
+                ColumnDC(column_name="question_fk"): question.pk,
+            }
+
+            rows.append((where_clauses, set_dict))
+            rows_questions.append(question)
+
+        # Upserted rows are written through to cache, so they're needed at once
+        assert not in_transaction(), "Answers upsert can't be deferred by transaction()"
+        results = AnswerDB.update_or_insert_many(rows)
+
+        overwritten_names = [q.name for q, res in zip(rows_questions, results) if res.is_conflict]
+        if overwritten_names:
+            logger.info(
+                f"Overwritten existing answers on {ud.conv_storage.day}: {overwritten_names}"
             )
 
+        ud.db_cache.add_answers([res.row for res in results if res.row is not None])
+
     assert isinstance(ud.conv_storage, ASKQuestionsConvStorage)
     if any(map(lambda x: x is not None, ud.conv_storage.cur_answers)):
-        update_db_with_answers()
-        ud.db_cache.reload_all()
+        await asyncio.to_thread(update_db_with_answers)
 
     await send_entity_answers_df(
         update=update, db_cache=ud.db_cache, answer_type=AnswerType.QUESTION, is_send_csv=True
@@ -442,12 +464,12 @@ async def on_end_asking_event(ud: UserData, update: Update):
         new_time: datetime.time = ud.conv_storage.event_time
         new_text: str | None = ud.conv_storage.event_text
 
-        insert_event_answer(event, day, new_time, new_text)
+        answer = insert_event_answer(event, day, new_time, new_text)
+        ud.db_cache.add_answers([answer])
 
     assert isinstance(ud.conv_storage, ASKEventConvStorage)
 
-    update_db_with_events()
-    ud.db_cache.reload_all()
+    await asyncio.to_thread(update_db_with_events)
 
     await send_entity_answers_df(
         update=update, db_cache=ud.db_cache, answer_type=AnswerType.EVENT, is_send_csv=True
@@ -1,4 +1,6 @@
 import datetime
+import functools
+import heapq
 import logging
 from dataclasses import dataclass
 from typing import (
@@ -70,7 +72,7 @@ class TextMatchMixin(NameableMixin):
 
 @dataclass
 class ValueMixin:
-    def value_on_day(self, all_answers: list[AnswerDB], on_day: datetime.date) -> str:
+    def value_on_day(self, db_cache: UserDBCache, on_day: datetime.date) -> str:
         raise NotImplementedError
 
 
@@ -85,18 +87,22 @@ class GeneratedMetricEvent(NameableMixin, ValueMixin):
     custom_dt_start_add: datetime.timedelta = datetime.timedelta(0)
     custom_dt_end_add: datetime.timedelta = datetime.timedelta(0)
 
-    def __match_answer(self, answer: AnswerDB) -> bool:
-        if answer.event:
-            if self.target_event_id:
-                return self.target_event_id == answer.event.pk
-            if self.target_event_name:
-                return self.target_event_name == answer.event.ascii_lower_name()
-            raise Exception(
-                "You need to either specify metric.target_event_name or metric.target_event_id"
-            )
-        return False
-
-    def __filter_answers(self, all_answers: list[AnswerDB], on_day: datetime.date):
+    def __target_events_pks(self, db_cache: UserDBCache) -> list[int]:
+        if self.target_event_id:
+            return [self.target_event_id]
+        if self.target_event_name:
+            return [
+                event_pk
+                for event_pk, event_index in db_cache.answers_by_event_time.items()
+                if event_index.answers
+                and event_index.answers[0].event
+                and self.target_event_name == event_index.answers[0].event.ascii_lower_name()
+            ]
+        raise Exception(
+            "You need to either specify metric.target_event_name or metric.target_event_id"
+        )
+
+    def __filter_answers(self, db_cache: UserDBCache, on_day: datetime.date) -> list[AnswerDB]:
         day_start = datetime.datetime.combine(date=on_day, time=datetime.time.min)
         day_end = day_start + datetime.timedelta(days=1)
 
@@ -105,17 +111,24 @@ class GeneratedMetricEvent(NameableMixin, ValueMixin):
         start_dt = day_start + self.custom_dt_start_add
         end_dt = day_end + self.custom_dt_end_add
 
-        bound_by_dt = lambda x: start_dt < x.get_timestamp() < end_dt
-        apply_filter = lambda x: bound_by_dt(x) and self.__match_answer(x)
+        # Bisect over time index of each target event, instead of scanning all answers
+        events_answers = [
+            db_cache.answers_between(start_dt, end_dt, event_pk=event_pk)
+            for event_pk in self.__target_events_pks(db_cache)
+        ]
+        if len(events_answers) == 1:
+            answers = events_answers[0]
+        else:
+            answers = list(heapq.merge(*events_answers, key=AnswerDB.sort_key))
 
-        return list(filter(apply_filter, all_answers))
+        return [x for x in answers if x.event]
 
     # @staticmethod
     def _value_on_target_answers(self, target_answers: list[AnswerDB]):
         raise NotImplementedError
 
-    def value_on_day(self, all_answers: list[AnswerDB], on_day: datetime.date):
-        target_answers = self.__filter_answers(all_answers, on_day)
+    def value_on_day(self, db_cache: UserDBCache, on_day: datetime.date):
+        target_answers = self.__filter_answers(db_cache, on_day)
         metric_value = self._value_on_target_answers(target_answers)
 
         return metric_value
@@ -187,8 +200,8 @@ class CombineOtherMetrics(NameableMixin, ValueMixin):
 
     prefix = "[FIRST]"
 
-    def value_on_day(self, all_answers: list[AnswerDB], on_day: datetime.date):
-        metrics_values = list(map(lambda x: x.value_on_day(all_answers, on_day), self.metrics_list))
+    def value_on_day(self, db_cache: UserDBCache, on_day: datetime.date):
+        metrics_values = list(map(lambda x: x.value_on_day(db_cache, on_day), self.metrics_list))
 
         if None in metrics_values:
             return None
@@ -290,6 +303,19 @@ def format_metric_value(metric: MetricType, metric_value: Any) -> str | None:
 def get_gen_metrics_event_df(
     db_cache: UserDBCache,
     gen_metrics: list[MetricType],
+) -> pd.DataFrame:
+    """
+    Memoized by cache data version (see `UserDBCache.memoized`)
+    """
+    return db_cache.memoized(
+        ("gen_metrics_event_df", tuple(map(lambda x: x.fullname, gen_metrics))),
+        functools.partial(_build_gen_metrics_event_df, db_cache, gen_metrics),
+    )
+
+
+def _build_gen_metrics_event_df(
+    db_cache: UserDBCache,
+    gen_metrics: list[MetricType],
 ) -> pd.DataFrame:
     days: list[datetime.date] = sorted(db_cache.question_answers_days_set)
 
@@ -297,7 +323,7 @@ def get_gen_metrics_event_df(
 
     for day in days:
         for metric in gen_metrics:
-            metric_value = metric.value_on_day(db_cache.answers, day)
+            metric_value = metric.value_on_day(db_cache, day)
             formatted_value: str | None = format_metric_value(metric, metric_value)
 
             index = metric.fullname
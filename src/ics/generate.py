@@ -1,5 +1,6 @@
 import datetime
 from dataclasses import dataclass
+from typing import Iterable
 
 import icalendar
 from icalendar import (
@@ -40,7 +41,7 @@ class CalEventDC:
         return event
 
 
-def gen_calendar_events_from_db_event(answers: list[AnswerDB]) -> list[CalEventDC]:
+def gen_calendar_events_from_db_event(answers: Iterable[AnswerDB]) -> list[CalEventDC]:
     cal_events_list: list[CalEventDC] = []
 
     tmp_event_start_timestamps: dict[str, datetime] = {}
@@ -64,7 +65,7 @@ def gen_calendar_events_from_db_event(answers: list[AnswerDB]) -> list[CalEventD
     return cal_events_list
 
 
-def gen_ics_from_answers_db(answers: list[AnswerDB]) -> bytes:
+def gen_ics_from_answers_db(answers: Iterable[AnswerDB]) -> bytes:
     cal_events = gen_calendar_events_from_db_event(answers)
 
     cal = Calendar()
@@ -1,3 +1,4 @@
+import asyncio
 import functools
 import logging
 import os
@@ -44,15 +45,25 @@ def raise_proper_http(func):
 @raise_proper_http
 async def get_feed(
     username: str,
+    days: int | None = None,
 ):
-    from src.user_data import (
-        UserDBCache,
+    """
+    @param days: If given, only events of last @days days are included in calendar
+    """
+    from src.tables.answer import (
+        AnswerDB,
+    )
+    from src.utils import (
+        get_nth_delta_day,
     )
 
-    # TODO fetch only user-related, e.g. filter by UserId
-    db_cache = UserDBCache()
+    date_from = get_nth_delta_day(-days) if days is not None else None
 
-    cal_str = gen_ics_from_answers_db(db_cache.answers)
+    # TODO fetch only user-related, e.g. filter by UserId
+    # Answers are streamed from DB while calendar is generated, not held in memory all at once
+    cal_str = await asyncio.to_thread(
+        lambda: gen_ics_from_answers_db(AnswerDB.iter_events_answers(date_from))
+    )
 
     dirname = "gen_ics/"
     fname = f"{username}_events.ics"
@@ -1,14 +1,27 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import dataclasses
 import enum
+import functools
+import itertools
 import logging
 import os
+import threading
+import time
 from dataclasses import dataclass
-from time import sleep
 from typing import (
     Any,
+    AsyncIterator,
+    Awaitable,
     Callable,
-    Iterable,
+    ClassVar,
+    Collection,
+    Coroutine,
+    Iterator,
     Optional,
     Sequence,
+    TypeVar,
 )
 
 import psycopg
@@ -18,14 +31,45 @@ from psycopg.sql import (
     Identifier,
     Placeholder,
 )
+from psycopg_pool import (
+    AsyncConnectionPool,
+)
+
+from src.orm.retry import (
+    DEFAULT_RETRY_POLICY,
+    RetryPolicy,
+    circuit_breaker,
+    is_connection_error,
+    is_transient_error,
+)
+from src.orm.stats import (
+    PG_STATS_TRACK_BYTES,
+    QueryMeasureDC,
+    query_stats,
+)
 
 PG_DB = os.environ.get("PG_DB", "postgres")
 PG_USER = os.environ.get("PG_USER", "postgres")
 PG_HOST = os.environ.get("PG_HOST", "localhost")
 PG_PASSWORD = os.environ.get("PG_PASSWORD", "postgres")
 
+PG_POOL_MIN_SIZE = int(os.environ.get("PG_POOL_MIN_SIZE", "1"))
+PG_POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX_SIZE", "10"))
+# Seconds to wait for a free connection before raising `psycopg_pool.PoolTimeout`
+PG_POOL_TIMEOUT = float(os.environ.get("PG_POOL_TIMEOUT", "30"))
+# Seconds after which an idle connection above `PG_POOL_MIN_SIZE` is closed
+PG_POOL_MAX_IDLE = float(os.environ.get("PG_POOL_MAX_IDLE", "600"))
+
+# Max number of distinct query shapes, kept compiled in `_compile_*` caches
+STATEMENT_CACHE_SIZE = int(os.environ.get("STATEMENT_CACHE_SIZE", "128"))
+
+# Rows fetched per round-trip by streaming selects (`_select_stream`, `Table.iter_select`)
+PG_STREAM_FETCH_SIZE = int(os.environ.get("PG_STREAM_FETCH_SIZE", "500"))
+
 TableName = str
 ValueType = Any
+QueryType = str | Composable
+ResultT = TypeVar("ResultT")
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +98,28 @@ class ColumnDC:
         return self.underscore_notation()
 
 
+@dataclass(frozen=True)
+class CoalesceDC:
+    """
+    Column expression "COALESCE(<column>, <default>)": nullable column, ordered & compared as NOT NULL one
+        (f.e. by `KeysetAfter`), so expression index on it is used
+
+    @param default: SQL literal, replacing NULLs, f.e. "'24:00'::time" (later than any time of day)
+    """
+
+    column: ColumnDC
+    default: str
+
+    def compose_by_dot(self) -> Composable:
+        return self.compose_value(self.column.compose_by_dot())
+
+    def compose_value(self, value: Composable) -> Composable:
+        return SQL("COALESCE({}, {})").format(value, SQL(self.default))
+
+
+OrderByColumnType = ColumnDC | CoalesceDC
+
+
 class JoinTypes(enum.Enum):
     INNER = 0
     LEFT = 1
@@ -67,8 +133,14 @@ class JoinByClauseDC:
     @param table_name
         Name of table to JOIN
 
+    @param from_table
+        Table (or alias) holding @from_column, primary table if None
+
+    @param alias
+        Alias of joined table, needed if the same table is joined more than once
+
     Result subquery:
-        JOIN <table_name> ON "<primary_table>"."<from_column>" "<table_name>"."<to_column>"
+        JOIN <table_name> [AS <alias>] ON "<from_table>"."<from_column>" = "<alias>"."<to_column>"
     """
 
     table_name: str
@@ -77,23 +149,423 @@ class JoinByClauseDC:
 
     join_type: JoinTypes = JoinTypes.INNER
 
+    from_table: str | None = None
+    alias: str | None = None
+
+
+class Predicate:
+    """
+    Composable condition for "WHERE" clause.
+    Can be combined with `&` (AND) and `|` (OR) operators:
+        In(col_question_fk, [1, 2]) & (Ge(col_date, day_from) | IsNull(col_time))
+
+    Predicate is split into a `shape` (structure, without values), used as statement cache key,
+        and `params` - values list, passed as query parameters.
+    """
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        """
+        @param names: Generator of unique placeholder names, one is taken for each param
+        """
+        raise NotImplementedError
+
+    def params(self) -> list[ValueType]:
+        """
+        Values, in same order as placeholders in `compose`
+        """
+        raise NotImplementedError
+
+    def shape(self) -> "Predicate":
+        """
+        Same predicate, with all values replaced by None
+        """
+        raise NotImplementedError
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        return And(self, other)
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Or(self, other)
+
+    @staticmethod
+    def from_dict(where_clauses: dict[ColumnDC, ValueType]) -> "Predicate":
+        """
+        { <col1>: <val1>, <col2>: <val2> } -> "col1" = val1 AND "col2" = val2
+        """
+        eq_list = [Eq(column, value) for column, value in where_clauses.items()]
+
+        if len(eq_list) == 1:
+            return eq_list[0]
+        return And(*eq_list)
+
+
+@dataclass(frozen=True)
+class Compare(Predicate):
+    """
+    "<column> <operator> <value>"
+    """
+
+    column: OrderByColumnType
+    value: ValueType = None
+
+    operator: ClassVar[str] = "="
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        return SQL("{} {} {}").format(
+            self.column.compose_by_dot(), SQL(self.operator), Placeholder(next(names))
+        )
+
+    def params(self) -> list[ValueType]:
+        return [self.value]
+
+    def shape(self) -> Predicate:
+        return dataclasses.replace(self, value=None)
+
+
+class Eq(Compare):
+    operator = "="
+
+
+class Ne(Compare):
+    operator = "<>"
+
+
+class Lt(Compare):
+    operator = "<"
+
+
+class Le(Compare):
+    operator = "<="
+
+
+class Gt(Compare):
+    operator = ">"
+
+
+class Ge(Compare):
+    operator = ">="
+
+
+@dataclass(frozen=True)
+class In(Predicate):
+    """
+    "<column> = ANY(<values>)", values are passed as single array param
+    """
+
+    column: ColumnDC
+    values: tuple[ValueType, ...] | None = None
+
+    def __post_init__(self):
+        if self.values is not None:
+            object.__setattr__(self, "values", tuple(self.values))
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        return SQL("{} = ANY({})").format(self.column.compose_by_dot(), Placeholder(next(names)))
+
+    def params(self) -> list[ValueType]:
+        return [list(self.values)]
+
+    def shape(self) -> Predicate:
+        return dataclasses.replace(self, values=None)
+
+
+@dataclass(frozen=True)
+class Between(Predicate):
+    """
+    "<column> BETWEEN <low> AND <high>" (both bounds are inclusive)
+    """
+
+    column: ColumnDC
+    low: ValueType = None
+    high: ValueType = None
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        return SQL("{} BETWEEN {} AND {}").format(
+            self.column.compose_by_dot(), Placeholder(next(names)), Placeholder(next(names))
+        )
+
+    def params(self) -> list[ValueType]:
+        return [self.low, self.high]
+
+    def shape(self) -> Predicate:
+        return dataclasses.replace(self, low=None, high=None)
+
+
+@dataclass(frozen=True)
+class IsNull(Predicate):
+    column: ColumnDC
+    negate: bool = False
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        template = "{} IS NOT NULL" if self.negate else "{} IS NULL"
+        return SQL(template).format(self.column.compose_by_dot())
+
+    def params(self) -> list[ValueType]:
+        return []
+
+    def shape(self) -> Predicate:
+        return self
+
+
+def IsNotNull(column: ColumnDC) -> IsNull:
+    return IsNull(column, negate=True)
+
+
+@dataclass(frozen=True)
+class Const(Predicate):
+    """
+    "TRUE" / "FALSE"
+    """
+
+    value: bool
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        return SQL("TRUE" if self.value else "FALSE")
+
+    def params(self) -> list[ValueType]:
+        return []
+
+    def shape(self) -> Predicate:
+        return self
+
+
+@dataclass(frozen=True, init=False)
+class And(Predicate):
+    predicates: tuple[Predicate, ...]
+
+    separator: ClassVar[str] = " AND "
+
+    def __init__(self, *predicates: Predicate):
+        object.__setattr__(self, "predicates", predicates)
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        composed_list = [p.compose(names) for p in self.predicates]
+        return SQL("({})").format(SQL(self.separator).join(composed_list))
+
+    def params(self) -> list[ValueType]:
+        return [value for p in self.predicates for value in p.params()]
 
-def _psql_conn():
-    conn = psycopg.connect(dbname=PG_DB, user=PG_USER, password=PG_PASSWORD, host=PG_HOST)
-    return conn
+    def shape(self) -> Predicate:
+        return self.__class__(*(p.shape() for p in self.predicates))
 
 
-_pg_conn = None
+@dataclass(frozen=True, init=False)
+class Or(And):
+    separator: ClassVar[str] = " OR "
 
 
-def get_psql_conn():
+@dataclass(frozen=True)
+class RowGt(Predicate):
+    """
+    "(<c1>, <c2>, ...) > (<v1>, <v2>, ...)" - row comparison, for NOT NULL columns only
+        (NULL on either side makes it NULL).
+    Btree index on (c1, c2, ...) is used by it, as its range bound.
+    Values of `CoalesceDC` columns are coalesced the same way, so None can be given for them.
+    """
+
+    columns: tuple[OrderByColumnType, ...]
+    values: tuple[ValueType, ...] | None = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "columns", tuple(self.columns))
+        if self.values is not None:
+            object.__setattr__(self, "values", tuple(self.values))
+
+    def compose(self, names: Iterator[str]) -> Composable:
+        values = [
+            c.compose_value(Placeholder(next(names)))
+            if isinstance(c, CoalesceDC)
+            else Placeholder(next(names))
+            for c in self.columns
+        ]
+        return SQL("({}) > ({})").format(
+            SQL(", ").join([c.compose_by_dot() for c in self.columns]), SQL(", ").join(values)
+        )
+
+    def params(self) -> list[ValueType]:
+        return list(self.values)
+
+    def shape(self) -> Predicate:
+        return dataclasses.replace(self, values=None)
+
+
+def KeysetAfter(
+    columns: Sequence[OrderByColumnType],
+    values: Sequence[ValueType],
+    nullable: Collection[OrderByColumnType] = (),
+) -> Predicate:
+    """
+    Rows following the row with @values of @columns, in "ORDER BY <columns>" (ascending) order.
+
+    Without @nullable columns it's a row comparison (see `RowGt`), using index on @columns.
+    Nullable column can be ordered by `CoalesceDC` (with an expression index), to stay such.
+
+    Otherwise, it's (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...
+        @nullable columns' NULLs are considered the largest values (as Postgres sorts them by default),
+        so "c > NULL" matches nothing, "c > v" also matches NULLs, and "c = NULL" is "c IS NULL".
+
+    For pagination @columns must identify row (f.e. end with primary key)
+    """
+    assert len(columns) == len(values) > 0
+
+    if not any(c in nullable for c in columns):
+        return RowGt(tuple(columns), tuple(values))
+
+    def greater(column: OrderByColumnType, value: ValueType) -> Predicate:
+        if column in nullable:
+            return Gt(column, value) | IsNull(column)
+        return Gt(column, value)
+
+    def equal(column: OrderByColumnType, value: ValueType) -> Predicate:
+        return IsNull(column) if value is None else Eq(column, value)
+
+    alternatives: list[Predicate] = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        if value is None:
+            continue
+
+        preceding = [equal(c, v) for c, v in zip(columns[:i], values[:i])]
+        alternatives.append(
+            And(*preceding, greater(column, value)) if preceding else greater(column, value)
+        )
+
+    if not alternatives:
+        # Nothing follows the row of NULLs only
+        return Const(False)
+
+    return Or(*alternatives) if len(alternatives) > 1 else alternatives[0]
+
+
+def placeholder_names(prefix: str = "w") -> Iterator[str]:
+    # w0, w1, w2, ...
+    return map(lambda i: f"{prefix}{i}", itertools.count())
+
+
+@dataclass
+class CompiledStatement:
+    """
+    Query of a fixed shape (tables, columns, clauses), with only parameters varying between calls.
+
+    Composed once by `_compile_*` functions (cached by shape), rendered to sql string
+        on the first execution, and then executed as server-side prepared statement.
+    """
+
+    composed: Composable
+    sql: str | None = None
+
+    def render(self, context: psycopg.AsyncConnection) -> str:
+        if self.sql is None:
+            self.sql = self.composed.as_string(context)
+        return self.sql
+
+
+# === Connection pool ===
+#
+# All queries go through a single `AsyncConnectionPool`, living on its own event loop
+# in a background thread ("pool loop"). This way:
+#   - async code (bot handlers, FastAPI endpoints) awaits queries without blocking its own loop
+#   - sync code (existing callers of `_query_get`, `Table.select`, ...) blocks only its own thread
+#   - concurrent callers use different pool connections instead of queueing on a single one
+
+_pool: AsyncConnectionPool | None = None
+_pool_loop: asyncio.AbstractEventLoop | None = None
+_pool_lock = threading.Lock()
+
+
+def _pool_conninfo() -> str:
+    return psycopg.conninfo.make_conninfo(
+        dbname=PG_DB, user=PG_USER, password=PG_PASSWORD, host=PG_HOST
+    )
+
+
+def _get_pool_loop() -> asyncio.AbstractEventLoop:
     # pylint: disable=global-statement
-    global _pg_conn
+    global _pool, _pool_loop
+
+    # Double-checked: lock is taken only to start the loop, not by every query
+    loop = _pool_loop
+    if loop is not None and not loop.is_closed():
+        return loop
+
+    with _pool_lock:
+        if _pool_loop is None or _pool_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="psql-pool", daemon=True).start()
+
+            pool = AsyncConnectionPool(
+                conninfo=_pool_conninfo(),
+                min_size=PG_POOL_MIN_SIZE,
+                max_size=PG_POOL_MAX_SIZE,
+                timeout=PG_POOL_TIMEOUT,
+                max_idle=PG_POOL_MAX_IDLE,
+                # Health check: every connection is pinged before given out of the pool
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            asyncio.run_coroutine_threadsafe(pool.open(), loop).result()
+
+            _pool, _pool_loop = pool, loop
+
+    return _pool_loop
+
 
-    if not _pg_conn or _pg_conn.closed:
-        _pg_conn = _psql_conn()
+def get_pool() -> AsyncConnectionPool:
+    _get_pool_loop()
+    assert _pool is not None
+    return _pool
+
+
+def _submit(coro: Coroutine[Any, Any, ResultT]) -> concurrent.futures.Future:
+    return asyncio.run_coroutine_threadsafe(coro, _get_pool_loop())
+
+
+def run_sync(coro: Coroutine[Any, Any, ResultT]) -> ResultT:
+    """
+    Sync shim: runs @coro on the pool loop, blocking the *calling* thread until it is done.
+    Must not be called from a running event loop (use `run_async` there instead):
+        it would block that loop, or deadlock, if it's the pool loop itself.
+    """
+    if _is_loop_running():
+        coro.close()
+        raise RuntimeError("run_sync() called from a running event loop, use run_async()")
 
-    return _pg_conn
+    return _submit(coro).result()
+
+
+def _is_loop_running() -> bool:
+    """
+    Whether calling thread runs an event loop (cheaper than `asyncio.get_running_loop()`, not raising)
+    """
+    return asyncio._get_running_loop() is not None
+
+
+async def run_async(coro: Coroutine[Any, Any, ResultT]) -> ResultT:
+    """
+    Runs @coro on the pool loop, without blocking the caller's event loop
+    """
+    return await asyncio.wrap_future(_submit(coro))
+
+
+def pool_stats() -> dict[str, int]:
+    """
+    Pool counters (`pool_size`, `pool_available`, `requests_waiting`, ...),
+        see `psycopg_pool.AsyncConnectionPool.get_stats`
+    """
+    if _pool is None:
+        return {}
+    return _pool.get_stats()
+
+
+def close_pool() -> None:
+    # pylint: disable=global-statement
+    global _pool, _pool_loop
+
+    with _pool_lock:
+        if _pool is not None and _pool_loop is not None:
+            asyncio.run_coroutine_threadsafe(_pool.close(), _pool_loop).result()
+            _pool_loop.call_soon_threadsafe(_pool_loop.stop)
+
+        _pool, _pool_loop = None, None
 
 
 def dict_cols_to_str(
@@ -118,65 +590,459 @@ def dict_cols_to_str(
     return new_d
 
 
-def retry_if_failed(func: Callable, conn: psycopg.Connection, cnt_tryed: int = 0):
-    if cnt_tryed >= 3:
-        raise psycopg.errors.OperationalError
+async def retry_if_failed(
+    func: Callable[[psycopg.AsyncConnection], Awaitable[ResultT]],
+    policy: RetryPolicy = DEFAULT_RETRY_POLICY,
+) -> ResultT:
+    """
+    Runs @func with a connection taken from the pool.
+
+    Transient errors (see `retry.is_transient_error`) are retried according to @policy,
+        with jittered exponential backoff; permanent ones are raised immediately.
+    Only on connection-level failures pool is checked, to reconnect broken connections.
+
+    While DB is down (see `retry.circuit_breaker`) fails fast with `CircuitOpenError`.
+    """
+    circuit_breaker.before_call()
+
+    for attempt in range(policy.attempts):
+        try:
+            async with get_pool().connection() as conn:
+                result = await func(conn)
+        except Exception as exc:
+            if not is_transient_error(exc):
+                # DB did respond, the error is caused by query itself
+                circuit_breaker.on_success()
+                raise
+
+            if attempt + 1 >= policy.attempts:
+                circuit_breaker.on_failure()
+                raise
+
+            logger.warning(
+                f"{exc.__class__.__name__} occurred, retrying ({attempt + 1}/{policy.attempts}).."
+            )
+
+            if is_connection_error(exc):
+                await get_pool().check()
+
+            await asyncio.sleep(policy.delay(attempt))
+        else:
+            circuit_breaker.on_success()
+            return result
+
+    raise psycopg.OperationalError(f"No attempts made, policy: {policy}")
+
+
+def _prepare_query(
+    query: QueryType | CompiledStatement, conn: psycopg.AsyncConnection
+) -> tuple[str, bool | None]:
+    """
+    @return: sql string to execute & `prepare` flag for `cursor.execute`
+        CompiledStatement is always prepared: its shape is known to be reused,
+        others are left to psycopg's default (prepared after `prepare_threshold` executions)
+    """
+    if isinstance(query, CompiledStatement):
+        return query.render(conn), True
+    if isinstance(query, Composable):
+        return query.as_string(conn), None
+    return query, None
+
+
+def _fetched_bytes(cur: psycopg.AsyncCursor) -> int:
+    """
+    Size of values in current result of @cur (as received from server)
+    """
+    res = cur.pgresult
+    if not PG_STATS_TRACK_BYTES or res is None:
+        return 0
+
+    return sum(
+        res.get_length(row_i, col_i) for row_i in range(res.ntuples) for col_i in range(res.nfields)
+    )
+
+
+async def _aquery_get(
+    query: QueryType | CompiledStatement, params: Optional[dict | Sequence] = tuple()
+) -> list[tuple]:
+    async def try_func(conn: psycopg.AsyncConnection) -> list[tuple]:
+        sql, prepare = _prepare_query(query, conn)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            query_for_print = sql
+            query_for_print = query_for_print.replace('"question"', "q")
+            query_for_print = query_for_print.replace('"answer"', "a")
+            query_for_print = query_for_print.replace('"event"', "e")
+
+            # print(sqlparse.format(query_for_print, reindent=True))
+            # print("Params:", params)
+            logger.debug(f"{query_for_print}, {params}")
+
+        with query_stats.measure(sql, params) as measure:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params, prepare=prepare)
+
+                results = await cur.fetchall()
+
+                measure.rows = len(results)
+                measure.bytes_fetched = _fetched_bytes(cur)
+                return results
+
+    return await retry_if_failed(try_func)
+
+
+async def _aquery_set(
+    query: QueryType | CompiledStatement, params: Optional[dict | Sequence] = tuple()
+) -> list[tuple] | None:
+    """
+    Executes & commits modifying query.
+    @return: rows of "RETURNING" clause, if @query has one, otherwise None
+    """
+
+    async def try_func(conn: psycopg.AsyncConnection) -> list[tuple] | None:
+        sql, prepare = _prepare_query(query, conn)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{sql}, {params}")
+
+        with query_stats.measure(sql, params) as measure:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, params, prepare=prepare)
+
+                results = await cur.fetchall() if cur.description else None
+                await conn.commit()
+
+                measure.rows = cur.rowcount
+                return results
+
+    return await retry_if_failed(try_func)
+
+
+async def _aquery_set_batch(
+    batch: Sequence[tuple[QueryType | CompiledStatement, Sequence[dict | Sequence]]]
+) -> list[list[tuple | None]]:
+    """
+    Executes modifying queries, all in one transaction, with a single commit.
+    Each query is executed for every of its params sets via (pipelined) `executemany`.
+
+    @param batch: List of (<query>, <list of params sets>)
+
+    @return: For each query - list of its results, one per params set:
+        first row of "RETURNING" clause, or None if there is no such clause / no row returned
+    """
+
+    async def try_func(conn: psycopg.AsyncConnection) -> list[list[tuple | None]]:
+        results: list[list[tuple | None]] = []
+
+        async with conn.transaction():
+            for query, params_seq in batch:
+                sql, _ = _prepare_query(query, conn)
 
-    conn.close()
-    new_conn = get_psql_conn()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"{sql}, {len(params_seq)} params sets")
+
+                query_results: list[tuple | None] = []
+
+                # First params set is kept as an example (f.e. for `explain_slow_query`)
+                example_params = params_seq[0] if params_seq else None
+
+                with query_stats.measure(sql, example_params) as measure:
+                    async with conn.cursor() as cur:
+                        await cur.executemany(sql, params_seq, returning=True)
+
+                        for _ in params_seq:
+                            query_results.append(await cur.fetchone() if cur.description else None)
+                            cur.nextset()
+
+                    measure.rows = len(params_seq)
+
+                results.append(query_results)
+
+        return results
+
+    return await retry_if_failed(try_func)
+
+
+async def _aexplain(
+    query: QueryType | CompiledStatement,
+    params: Optional[dict | Sequence] = tuple(),
+    analyze: bool = False,
+) -> str:
+    """
+    @param analyze: Also execute query, to get real timings ("EXPLAIN ANALYZE").
+        It's done in a transaction which is always rolled back, so modifying queries are safe to explain
+    """
 
+    async def try_func(conn: psycopg.AsyncConnection) -> str:
+        sql, _ = _prepare_query(query, conn)
+        explain_prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+
+        async with conn.transaction(force_rollback=True):
+            async with conn.cursor() as cur:
+                await cur.execute(explain_prefix + sql, params)
+                plan_rows = await cur.fetchall()
+
+        return "\n".join(map(lambda x: x[0], plan_rows))
+
+    return await retry_if_failed(try_func)
+
+
+def explain(
+    query: QueryType | CompiledStatement,
+    params: Optional[dict | Sequence] = tuple(),
+    analyze: bool = False,
+) -> str:
+    return run_sync(_aexplain(query, params, analyze))
+
+
+def explain_slow_query(index: int = -1, analyze: bool = False) -> str:
+    """
+    Query plan of a query from slow queries log (by default, of the latest one)
+    """
+    slow_query = query_stats.slow_queries[index]
+    return explain(slow_query.sql, slow_query.params, analyze=analyze)
+
+
+# Names of server-side cursors, unique within the process
+_stream_cursor_ids = itertools.count()
+
+
+async def _aquery_stream(
+    query: QueryType | CompiledStatement,
+    params: Optional[dict | Sequence] = tuple(),
+    fetch_size: int = PG_STREAM_FETCH_SIZE,
+) -> AsyncIterator[list[tuple]]:
+    """
+    Streams rows of @query in chunks of up to @fetch_size rows, via named (server-side) cursor,
+        so only a single chunk is held in memory at a time.
+
+    Connection is taken from the pool for the whole time of streaming (until exhausted or closed).
+    Unlike `_aquery_get`, is not retried: part of results may be already consumed on failure.
+    """
+    circuit_breaker.before_call()
+
+    measure = QueryMeasureDC()
+    duration_ms: float = 0
+    is_error = False
+
+    sql: str | None = None
     try:
-        return func(new_conn)
-    except psycopg.errors.OperationalError:
-        logger.warning("psycopg.OperationalError occurred, retrying..")
-        sleep(1)
-        return retry_if_failed(func, new_conn, cnt_tryed=cnt_tryed + 1)
-    except psycopg.errors.InFailedSqlTransaction:
-        sleep(1)
-        return retry_if_failed(func, new_conn, cnt_tryed=cnt_tryed + 1)
+        async with get_pool().connection() as conn:
+            sql, _ = _prepare_query(query, conn)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{sql}, {params}, streamed by {fetch_size}")
+
+            # Named cursor lives within transaction, which is rolled back by the pool on return
+            async with conn.cursor(name=f"stream_{next(_stream_cursor_ids)}") as cur:
+                start = time.perf_counter()
+                await cur.execute(sql, params)
+
+                while True:
+                    rows = await cur.fetchmany(fetch_size)
+
+                    measure.rows += len(rows)
+                    measure.bytes_fetched += _fetched_bytes(cur)
+                    # Only time spent in DB is counted, not of consumer processing chunks
+                    duration_ms += (time.perf_counter() - start) * 1000
+
+                    if not rows:
+                        break
+
+                    yield rows
+                    start = time.perf_counter()
+    except Exception as exc:
+        is_error = True
+        if is_transient_error(exc):
+            circuit_breaker.on_failure()
+        else:
+            circuit_breaker.on_success()
+        raise
+    finally:
+        if not is_error:
+            circuit_breaker.on_success()
+        if sql is not None:
+            query_stats.record(sql, params, duration_ms, measure, is_error)
+
+
+async def _anext(stream: AsyncIterator[ResultT]) -> ResultT:
+    # `run_sync` accepts coroutines only, and `stream.__anext__()` is not one
+    return await stream.__anext__()
+
+
+def _query_stream(
+    query: QueryType | CompiledStatement,
+    params: Optional[dict | Sequence] = tuple(),
+    fetch_size: int = PG_STREAM_FETCH_SIZE,
+) -> Iterator[list[tuple]]:
+    """
+    Sync shim of `_aquery_stream`: every chunk is fetched on the pool loop, blocking the calling thread.
+    If not exhausted, should be closed (f.e. by leaving `for` loop over it) to give connection back.
+    """
+    stream = _aquery_stream(query, params, fetch_size)
+
+    try:
+        while True:
+            try:
+                chunk = run_sync(_anext(stream))
+            except StopAsyncIteration:
+                return
+
+            yield chunk
+    finally:
+        if _is_loop_running():
+            # Closed by GC on an event loop thread (f.e. the pool one): can't wait there
+            _submit(stream.aclose())
+        else:
+            run_sync(stream.aclose())
+
 
+def _query_get(
+    query: QueryType | CompiledStatement, params: Optional[dict | Sequence] = tuple()
+) -> list[tuple]:
+    return run_sync(_aquery_get(query, params))
 
-def _query_get(query: str, params: Optional[dict | Sequence] = tuple()) -> list[tuple]:
-    query_for_print = query
-    query_for_print = query_for_print.replace('"question"', "q")
-    query_for_print = query_for_print.replace('"answer"', "a")
-    query_for_print = query_for_print.replace('"event"', "e")
 
-    # print(sqlparse.format(query_for_print, reindent=True))
-    # print("Params:", params)
-    logger.debug(f"{query_for_print}, {params}")
+def _query_set(
+    query: QueryType | CompiledStatement, params: Optional[dict | Sequence] = tuple()
+) -> list[tuple] | None:
+    return run_sync(_aquery_set(query, params))
 
-    def try_func(conn: psycopg.Connection) -> list[tuple]:
-        with conn.cursor() as cur:
-            cur.execute(query, params)
 
-            results = cur.fetchall()
-            return results
+def _query_set_batch(
+    batch: Sequence[tuple[QueryType | CompiledStatement, Sequence[dict | Sequence]]]
+) -> list[list[tuple | None]]:
+    return run_sync(_aquery_set_batch(batch))
 
-    return retry_if_failed(try_func, get_psql_conn())
 
+# === Unit of work ===
 
-def _query_set(query: str, params: Optional[dict | Sequence] = tuple()) -> None:
-    logger.debug(f"{query}, {params}")
 
-    def try_func(conn: psycopg.Connection):
-        with conn.cursor() as cur:
-            cur.execute(query, params)
-            conn.commit()
+@dataclass
+class PendingWriteDC:
+    query: QueryType | CompiledStatement
+    params: dict | Sequence
 
-    retry_if_failed(try_func, get_psql_conn())
+
+class Transaction:
+    """
+    Unit of work: modifying queries (`_insert_row`, `_update_row`, `update_or_insert_row(s)`),
+        made inside of `with transaction():` (or `async with transaction():`), are not executed at once,
+        but collected, and on exit are flushed all together in one DB transaction, with a single commit.
+    If exited by exception, collected writes are discarded.
+
+    Writes of the same statement, made one after another, are sent in one batch (`executemany`).
+    Deferred writes return None; "RETURNING" rows are available after exit in `results` (in order of writes).
+    Nested `transaction()` joins the outer one.
+
+    Current transaction is kept in a context variable, so it's seen by code called from the `with` block,
+        including `asyncio.to_thread` (which copies context).
+    Sync `with` blocks the calling thread on flush, in async code use `async with`.
+    """
+
+    def __init__(self):
+        self.pending: list[PendingWriteDC] = []
+        self.results: list[tuple | None] = []
+
+        self._is_outer = False
+        self._token: contextvars.Token | None = None
+
+    def add(self, query: QueryType | CompiledStatement, params: dict | Sequence) -> None:
+        self.pending.append(PendingWriteDC(query=query, params=params))
+
+    def batch(self) -> list[tuple[QueryType | CompiledStatement, list[dict | Sequence]]]:
+        """
+        Pending writes in `_aquery_set_batch` format: consecutive writes of the same query are grouped
+        """
+        batch: list[tuple[QueryType | CompiledStatement, list[dict | Sequence]]] = []
+
+        for write in self.pending:
+            if batch and batch[-1][0] is write.query:
+                batch[-1][1].append(write.params)
+            else:
+                batch.append((write.query, [write.params]))
+
+        return batch
+
+    def _enter(self) -> "Transaction":
+        outer = _current_transaction.get()
+        if outer is not None:
+            return outer
+
+        self._is_outer = True
+        self._token = _current_transaction.set(self)
+        return self
+
+    def _exit(self, is_error: bool) -> bool:
+        """
+        @return: Whether there are pending writes to flush
+        """
+        if not self._is_outer:
+            return False
+
+        _current_transaction.reset(self._token)
+        self._is_outer = False
+
+        return not is_error and bool(self.pending)
+
+    def _set_results(self, batch_results: list[list[tuple | None]]) -> None:
+        self.results = [x for query_results in batch_results for x in query_results]
+        self.pending = []
+
+    def __enter__(self) -> "Transaction":
+        return self._enter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._exit(exc_type is not None):
+            self._set_results(_query_set_batch(self.batch()))
+
+    async def __aenter__(self) -> "Transaction":
+        return self._enter()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self._exit(exc_type is not None):
+            self._set_results(await run_async(_aquery_set_batch(self.batch())))
+
+
+_current_transaction: contextvars.ContextVar[Transaction | None] = contextvars.ContextVar(
+    "current_transaction", default=None
+)
+
+
+def transaction() -> Transaction:
+    return Transaction()
+
+
+def in_transaction() -> bool:
+    """
+    Whether writes are deferred by current `transaction()` (and return None instead of rows)
+    """
+    return _current_transaction.get() is not None
+
+
+def _write(query: QueryType | CompiledStatement, params: dict | Sequence) -> list[tuple] | None:
+    """
+    Executes modifying query, or defers it, if there is a current `transaction()`
+    """
+    current = _current_transaction.get()
+    if current is not None:
+        current.add(query, params)
+        return None
+
+    return _query_set(query, params)
 
 
 def _select(
     tablename: TableName,
     select_columns: list[ColumnDC] | None = None,
     join_clauses: list[JoinByClauseDC] | None = None,
-    where_clauses: dict[ColumnDC, ValueType] | None = None,
-    order_by_columns: list[ColumnDC] | None = None,
+    where_clauses: dict[ColumnDC, ValueType] | Predicate | None = None,
+    order_by_columns: list[OrderByColumnType] | None = None,
+    limit: int | None = None,
 ) -> Sequence:
     """
     Common parametrized function trying to fully imitate "SELECT" clause
-        optionally added with "WHERE", "JOIN ON", "ORDER BY" clauses
+        optionally added with "WHERE", "JOIN ON", "ORDER BY", "LIMIT" clauses
 
     @param tablename: TableName (str)
         name of table goes after "FROM" clause
@@ -188,19 +1054,96 @@ def _select(
         List of "JoinByClauseDC" Dataclass, specifying single "JOIN ... ON ..." clause:
 
     @param where_clauses:
-        Dict specifying key-value pairs for "WHERE (...) = (...)" clause:
+        Either `Predicate` (see `In`, `Between`, `Ge`, `IsNull`, `And`, `Or`, ...)
+        or Dict specifying key-value pairs for "WHERE <col1> = <val1> AND ..." clause:
             Format: { <col_name>: <col_value> }
 
     @param order_by_columns:
-        List specifying columns after "ORDER BY" clause
+        List specifying columns (or `CoalesceDC` expressions) after "ORDER BY" clause
+
+    @param limit:
+        Max count of rows to select (for pagination, see `KeysetAfter`)
 
     @return:
         List of rows, each length of @param<select_cols>, consisting of columns values
     """
 
-    # TODO add option for "WHERE col1 IN (1, 2)" clause
-    # TODO needed to search dict values for list, and add additional query string for those pairs
+    query, params = _select_statement(
+        tablename, select_columns, join_clauses, where_clauses, order_by_columns, limit
+    )
+
+    return _query_get(query=query, params=params)
+
+
+def _select_stream(
+    tablename: TableName,
+    select_columns: list[ColumnDC] | None = None,
+    join_clauses: list[JoinByClauseDC] | None = None,
+    where_clauses: dict[ColumnDC, ValueType] | Predicate | None = None,
+    order_by_columns: list[OrderByColumnType] | None = None,
+    fetch_size: int = PG_STREAM_FETCH_SIZE,
+    limit: int | None = None,
+) -> Iterator[list[tuple]]:
+    """
+    Same as `_select`, but rows are streamed in chunks of up to @fetch_size rows (see `_query_stream`)
+    """
+    query, params = _select_statement(
+        tablename, select_columns, join_clauses, where_clauses, order_by_columns, limit
+    )
+
+    return _query_stream(query=query, params=params, fetch_size=fetch_size)
+
 
+def _select_statement(
+    tablename: TableName,
+    select_columns: list[ColumnDC] | None,
+    join_clauses: list[JoinByClauseDC] | None,
+    where_clauses: dict[ColumnDC, ValueType] | Predicate | None,
+    order_by_columns: list[OrderByColumnType] | None,
+    limit: int | None = None,
+) -> tuple[CompiledStatement, dict[str, ValueType] | None]:
+    """
+    @return: compiled "SELECT" query & its parameters
+    """
+    if isinstance(where_clauses, dict):
+        where_clauses = Predicate.from_dict(where_clauses) if where_clauses else None
+
+    if where_clauses is not None:
+        where_placeholders_params: dict[str, ValueType] | None = dict(
+            zip(placeholder_names(), where_clauses.params())
+        )
+        where_shape: Predicate | None = where_clauses.shape()
+    else:
+        where_placeholders_params = None
+        where_shape = None
+
+    query = _compile_select(
+        tablename,
+        tuple(select_columns or ()),
+        tuple(join_clauses or ()),
+        where_shape,
+        tuple(order_by_columns or ()),
+        limit is not None,
+    )
+
+    if limit is not None:
+        where_placeholders_params = {**(where_placeholders_params or {}), "limit": limit}
+
+    return query, where_placeholders_params
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_select(
+    tablename: TableName,
+    select_columns: tuple[ColumnDC, ...],
+    join_clauses: tuple[JoinByClauseDC, ...],
+    where_shape: Predicate | None,
+    order_by_columns: tuple[OrderByColumnType, ...],
+    has_limit: bool = False,
+) -> CompiledStatement:
+    """
+    Builds "SELECT" query template for `_select`, cached by query shape
+    """
     format_list: list[Composable] = []
     template_query = ""
 
@@ -230,52 +1173,41 @@ def _select(
                     template_subquery = " {}" + template_subquery
                     format_list.append(SQL(join_clause.join_type.name))
 
+            if join_clause.alias:
+                # " JOIN {} AS {} ON ..."
+                template_subquery = template_subquery.replace(" ON ", " AS {} ON ", 1)
+
             template_query += template_subquery
             format_list.extend(
                 map(
                     Identifier,
                     [
                         join_clause.table_name,
-                        tablename,
+                        *([join_clause.alias] if join_clause.alias else []),
+                        join_clause.from_table or tablename,
                         join_clause.from_column,
-                        join_clause.table_name,
+                        join_clause.alias or join_clause.table_name,
                         join_clause.to_column,
                     ],
                 )
             )
 
     # "WHERE" clause
-    if where_clauses:
-        template_query += " WHERE ({}) = ({})"
-
-        where_columns: list[ColumnDC] = list(where_clauses.keys())
-
-        where_placeholders_params: dict[str, ValueType] | None = {
-            k.underscore_notation(): v for k, v in where_clauses.items()
-        }
-
-        columns_identifiers: Iterable[Identifier] = map(ColumnDC.compose_by_dot, where_columns)
-        values_placeholders: Iterable[Placeholder] = map(
-            Placeholder, where_placeholders_params.keys()
-        )
-
-        format_list.extend(
-            [
-                SQL(", ").join(columns_identifiers),
-                SQL(", ").join(values_placeholders),
-            ]
-        )
-    else:
-        where_placeholders_params = None
+    if where_shape is not None:
+        template_query += " WHERE {}"
+        format_list.append(where_shape.compose(placeholder_names()))
 
     # "ORDER BY" clause
     if order_by_columns:
         template_query += " ORDER BY {}"
-        format_list.append(SQL(", ").join(map(ColumnDC.compose_by_dot, order_by_columns)))
+        format_list.append(SQL(", ").join([c.compose_by_dot() for c in order_by_columns]))
 
-    query = SQL(template_query).format(*format_list).as_string(get_psql_conn())
+    # "LIMIT" clause
+    if has_limit:
+        template_query += " LIMIT {}"
+        format_list.append(Placeholder("limit"))
 
-    return _query_get(query=query, params=where_placeholders_params)
+    return CompiledStatement(SQL(template_query).format(*format_list))
 
 
 def _exists(
@@ -285,49 +1217,83 @@ def _exists(
     return len(_select(tablename=tablename, where_clauses=where_clauses)) > 0
 
 
-def _insert_row(tablename: TableName, row_dict: dict[ColumnDC, Any]):
+def _insert_row(
+    tablename: TableName,
+    row_dict: dict[ColumnDC, Any],
+    returning_columns: Sequence[str] | None = None,
+) -> tuple | None:
+    """
+    @param returning_columns: Columns of inserted row to return (f.e. assigned by DB "pk")
+
+    @return:
+        Inserted row (consisting of @returning_columns values), or None if no @returning_columns given
+        (or if write is deferred by current `transaction()`)
+    """
     columns: tuple[ColumnDC] = tuple(row_dict.keys())
 
-    # ColumnDC -> str placeholder
-    placeholder_apply_func = lambda x: x.column_name  # noqa: E731
-
-    query = (
-        SQL("INSERT INTO {} ({}) VALUES ({})")
-        .format(
-            # tablename
-            Identifier(tablename),
-            # (col1, col2)
-            SQL(", ").join(map(ColumnDC.compose_by_dot, columns)),
-            # (%(col1)s, %(col1)s) -> ('val1', 'val2')
-            SQL(", ").join(map(Placeholder, map(placeholder_apply_func, columns))),
-        )
-        .as_string(get_psql_conn())
-    )
+    query = _compile_insert(tablename, columns, tuple(returning_columns or ()))
 
     try:
         prefixed_row_dict = dict_cols_to_str(
-            row_dict, prefix=None, column_apply_function=placeholder_apply_func
+            row_dict, prefix=None, column_apply_function=_insert_placeholder_name
         )
-        _query_set(query, prefixed_row_dict)
+        results = _write(query, prefixed_row_dict)
     except psycopg.errors.UniqueViolation as e:
         raise e
 
+    if returning_columns and results:
+        return results[0]
+    return None
+
+
+def _insert_placeholder_name(column: ColumnDC) -> str:
+    # ColumnDC -> str placeholder
+    return column.column_name
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_insert(
+    tablename: TableName, columns: tuple[ColumnDC, ...], returning_columns: tuple[str, ...] = ()
+) -> CompiledStatement:
+    query = SQL("INSERT INTO {} ({}) VALUES ({})").format(
+        # tablename
+        Identifier(tablename),
+        # (col1, col2)
+        SQL(", ").join(map(ColumnDC.compose_by_dot, columns)),
+        # (%(col1)s, %(col1)s) -> ('val1', 'val2')
+        SQL(", ").join(map(Placeholder, map(_insert_placeholder_name, columns))),
+    )
+
+    if returning_columns:
+        query += SQL(" RETURNING {}").format(SQL(", ").join(map(Identifier, returning_columns)))
+
+    return CompiledStatement(query)
+
 
 def _update_row(
     tablename: TableName,
     where_clauses: dict[ColumnDC, ValueType],
     set_dict: dict[ColumnDC, ValueType],
 ):
-    where_names = tuple(where_clauses.keys())
-    set_names = tuple(set_dict.keys())
-
     # This is done to avoid duplicate placeholder names in template query:
     # UPDATE table SET "col1" = %(set_col1)s WHERE ("col1", "col2") = (%(where_col1)s, %(where_col2)s)
     prefixed_where_dict = dict_cols_to_str(where_clauses, prefix="where_")
     prefixed_set_dict = dict_cols_to_str(set_dict, prefix="set_")
 
-    prefixed_where_names = tuple(prefixed_where_dict.keys())
-    prefixed_set_names = tuple(prefixed_set_dict.keys())
+    query = _compile_update(tablename, tuple(where_clauses.keys()), tuple(set_dict.keys()))
+
+    placeholder_values = {**prefixed_set_dict, **prefixed_where_dict}
+    _write(query, placeholder_values)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_update(
+    tablename: TableName,
+    where_names: tuple[ColumnDC, ...],
+    set_names: tuple[ColumnDC, ...],
+) -> CompiledStatement:
+    prefixed_where_names = tuple(map(lambda x: f"where_{x.underscore_notation()}", where_names))
+    prefixed_set_names = tuple(map(lambda x: f"set_{x.underscore_notation()}", set_names))
 
     if len(set_names) == 1:
         # "UPDATE {tablename} SET answer_text = '66664' WHERE (day_fk, question_fk) = ('2023-02-23', 'weight')"
@@ -338,38 +1304,200 @@ def _update_row(
         raise Exception
 
     # query = SQL("SELECT * FROM {} WHERE ({}) = ({})").format(
-    query = (
-        SQL(template_query)
-        .format(
-            # tablename     "question_answer"
-            Identifier(tablename),
-            # set columns   (col3, col4)
-            SQL(", ").join(map(ColumnDC.compose_by_dot, set_names)),
-            # set values    ('val1', 'val2')
-            SQL(", ").join(map(Placeholder, prefixed_set_names)),
-            # where columns (col1, col2)
-            SQL(", ").join(map(ColumnDC.compose_by_dot, where_names)),
-            # where values  (%(col1)s, %(col2)s)
-            SQL(", ").join(map(Placeholder, prefixed_where_names)),
-        )
-        .as_string(get_psql_conn())
+    query = SQL(template_query).format(
+        # tablename     "question_answer"
+        Identifier(tablename),
+        # set columns   (col3, col4)
+        SQL(", ").join(map(ColumnDC.compose_by_dot, set_names)),
+        # set values    ('val1', 'val2')
+        SQL(", ").join(map(Placeholder, prefixed_set_names)),
+        # where columns (col1, col2)
+        SQL(", ").join(map(ColumnDC.compose_by_dot, where_names)),
+        # where values  (%(col1)s, %(col2)s)
+        SQL(", ").join(map(Placeholder, prefixed_where_names)),
     )
-
-    placeholder_values = {**prefixed_set_dict, **prefixed_where_dict}
-    _query_set(query, placeholder_values)
+    return CompiledStatement(query)
 
 
 def update_or_insert_row(
     tablename: TableName,
     where_clauses: dict[ColumnDC, ValueType],
     set_dict: dict[ColumnDC, ValueType],
-):
-    # Ensure that full row values as passed neither in filter_dict nor set_dict
-    # columns_set = ...
-    # assert set(where_dict).union(set(set_dict)) == columns_set
+    returning_columns: Sequence[str] | None = None,
+) -> tuple | None:
+    """
+    Single round-trip upsert:
+        INSERT INTO <tablename> (<where cols>, <set cols>) VALUES (...)
+        ON CONFLICT (<where cols>) DO UPDATE SET (<set cols>) = ROW(EXCLUDED.<set cols>)
+        RETURNING <returning_columns>
 
-    if _exists(tablename, where_clauses):
-        _update_row(tablename, where_clauses, set_dict)
+    @param where_clauses:
+        Values of columns, identifying the row. Those columns must form a unique constraint
+        (or a unique index) of the table, which is used as "ON CONFLICT" target
+
+    @param set_dict:
+        Values of columns to set, both on insert and on update
+
+    @param returning_columns:
+        Columns of written row to return
+
+    @return:
+        Written row (consisting of @returning_columns values), or None if no @returning_columns given
+        (or if write is deferred by current `transaction()`)
+    """
+    row_dict = {**where_clauses, **set_dict}
+
+    query = _compile_upsert(
+        tablename,
+        tuple(row_dict.keys()),
+        tuple(map(lambda x: x.column_name, where_clauses.keys())),
+        tuple(set_dict.keys()),
+        tuple(returning_columns or ()),
+    )
+
+    params = dict_cols_to_str(row_dict, prefix=None, column_apply_function=_insert_placeholder_name)
+    results = _write(query, params)
+
+    if returning_columns and results:
+        return results[0]
+    return None
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _compile_upsert(
+    tablename: TableName,
+    insert_columns: tuple[ColumnDC, ...],
+    conflict_columns: tuple[str, ...],
+    update_columns: tuple[ColumnDC, ...],
+    returning_columns: tuple[str, ...],
+    returning_is_conflict: bool = False,
+) -> CompiledStatement:
+    """
+    @param returning_is_conflict:
+        Add "xmax <> 0" expression to the end of "RETURNING" clause,
+        which is True for updated (conflicted) rows, and False for newly inserted ones
+    """
+    insert_query = _compile_insert(tablename, insert_columns).composed
+
+    if len(update_columns) == 0:
+        template_conflict = " ON CONFLICT ({}) DO NOTHING"
+        conflict_format_list = [SQL(", ").join(map(Identifier, conflict_columns))]
     else:
+        if len(update_columns) == 1:
+            template_conflict = " ON CONFLICT ({}) DO UPDATE SET {} = {}"
+        else:
+            template_conflict = " ON CONFLICT ({}) DO UPDATE SET ({}) = ROW({})"
+
+        conflict_format_list = [
+            # (date, question_fk)
+            SQL(", ").join(map(Identifier, conflict_columns)),
+            # (text, time)
+            SQL(", ").join(map(lambda x: Identifier(x.column_name), update_columns)),
+            # (EXCLUDED.text, EXCLUDED.time)
+            SQL(", ").join(map(lambda x: Identifier("excluded", x.column_name), update_columns)),
+        ]
+
+    query = insert_query + SQL(template_conflict).format(*conflict_format_list)
+
+    returning_list: list[Composable] = list(map(Identifier, returning_columns))
+    if returning_is_conflict:
+        returning_list.append(SQL("xmax <> 0"))
+
+    if returning_list:
+        query += SQL(" RETURNING {}").format(SQL(", ").join(returning_list))
+
+    return CompiledStatement(query)
+
+
+@dataclass(frozen=True)
+class UpsertResultDC:
+    """
+    Result of single row write of `update_or_insert_rows`
+
+    @param row: Written row (values of `returning_columns`),
+        None if no `returning_columns` given, or row was skipped ("DO NOTHING" on conflict)
+
+    @param is_conflict: Whether row already existed (conflicted by unique constraint) and was updated
+    """
+
+    row: tuple | Any | None
+    is_conflict: bool
+
+
+def update_or_insert_rows(
+    tablename: TableName,
+    rows: Sequence[tuple[dict[ColumnDC, ValueType], dict[ColumnDC, ValueType]]],
+    returning_columns: Sequence[str] | None = None,
+) -> list[UpsertResultDC] | None:
+    """
+    Bulk version of `update_or_insert_row`: all rows are written in one transaction.
+    Rows of same shape (same where/set columns) are sent together via pipelined `executemany`.
+    Inside of current `transaction()`, rows are deferred to it, as other writes are.
+
+    @param rows: List of (<where_clauses>, <set_dict>) pairs, see `update_or_insert_row`
+
+    @return: Results in order of @rows, or None if writes are deferred by current `transaction()`
+        (its `results` then have raw "RETURNING" rows, with `is_conflict` flag as the last value)
+    """
+    if not rows:
+        return []
+
+    # <shape> : list of (<row index in @rows>, <params>)
+    shapes: dict[tuple, list[tuple[int, dict[str, ValueType]]]] = {}
+
+    for i, (where_clauses, set_dict) in enumerate(rows):
         row_dict = {**where_clauses, **set_dict}
-        _insert_row(tablename, row_dict)
+
+        shape = (
+            tuple(row_dict.keys()),
+            tuple(map(lambda x: x.column_name, where_clauses.keys())),
+            tuple(set_dict.keys()),
+        )
+        params = dict_cols_to_str(
+            row_dict, prefix=None, column_apply_function=_insert_placeholder_name
+        )
+
+        shapes.setdefault(shape, []).append((i, params))
+
+    shapes_list = list(shapes.items())
+    batch = [
+        (
+            _compile_upsert(tablename, *shape, tuple(returning_columns or ()), True),
+            [params for _, params in indexed_params],
+        )
+        for shape, indexed_params in shapes_list
+    ]
+
+    current = _current_transaction.get()
+    if current is not None:
+        for query, params_seq in batch:
+            for params in params_seq:
+                current.add(query, params)
+        return None
+
+    results: list[UpsertResultDC | None] = [None] * len(rows)
+
+    for (_, indexed_params), query_results in zip(shapes_list, _query_set_batch(batch)):
+        for (i, _), returned in zip(indexed_params, query_results):
+            if returned is None:
+                # "DO NOTHING" on conflict
+                results[i] = UpsertResultDC(row=None, is_conflict=True)
+            else:
+                results[i] = UpsertResultDC(
+                    row=tuple(returned[:-1]) if returning_columns else None,
+                    is_conflict=returned[-1],
+                )
+
+    return results
+
+
+def statement_cache_info() -> dict[str, functools._CacheInfo]:
+    """
+    Hit/miss counters of compiled query shapes, by statement kind
+    """
+    return {
+        "select": _compile_select.cache_info(),
+        "insert": _compile_insert.cache_info(),
+        "update": _compile_update.cache_info(),
+        "upsert": _compile_upsert.cache_info(),
+    }
@@ -1,7 +1,16 @@
+import dataclasses
+import datetime
+import functools
+import types
+import typing
 from dataclasses import dataclass
 from typing import (
+    Any,
     ClassVar,
+    Iterable,
+    Iterator,
     List,
+    Sequence,
     Type,
     TypeVar,
 )
@@ -9,11 +18,19 @@ from typing import (
 from src.orm import base
 from src.orm.base import (
     ColumnDC,
+    Gt,
     JoinByClauseDC,
     JoinTypes,
+    KeysetAfter,
+    OrderByColumnType,
+    Predicate,
     TableName,
+    UpsertResultDC,
     ValueType,
 )
+from src.orm.identity_map import (
+    IdentityMap,
+)
 from src.utils import MyEnum
 
 Tbl = TypeVar("Tbl", "Table", dataclass)
@@ -38,17 +55,383 @@ class BackForeignKey(ForeignKey):
         return f"back_{super().__str__()}"
 
 
+@dataclass(frozen=True)
+class TableLayoutDC:
+    """
+    Where object's columns are in selected row, and how to create object from them
+    """
+
+    class_: Type[Tbl]
+
+    # Slice of row, holding class columns (in `class_.__slots__` order)
+    start: int
+    end: int
+
+    # Offset (in row) of primary key column
+    pk_offset: int
+
+    # Selected columns, subset of `class_.__slots__` (in its order)
+    names: tuple[str, ...]
+    # Not all of columns are selected: objects are created partial (see `Table.__getattr__`)
+    is_partial: bool
+
+    # Offsets (relative to @start) of array columns, which values are converted list -> tuple
+    sequence_offsets: tuple[int, ...]
+
+    @staticmethod
+    def of(
+        class_: Type[Tbl], start: int = 0, names: Sequence[str] | None = None
+    ) -> "TableLayoutDC":
+        slots: tuple[str, ...] = class_.__slots__
+        names = tuple(names) if names is not None else slots
+
+        fields_types: dict[str, Any] = {x.name: x.type for x in dataclasses.fields(class_)}
+        types_list: list[Any] = [fields_types[x] for x in names]
+
+        return TableLayoutDC(
+            class_=class_,
+            start=start,
+            end=start + len(names),
+            pk_offset=start + names.index(class_.Meta.primary_key),
+            names=names,
+            is_partial=names != slots,
+            sequence_offsets=tuple(i for i, x in enumerate(types_list) if _is_sequence_type(x)),
+        )
+
+    @property
+    def tablename(self) -> TableName:
+        return self.class_.Meta.tablename
+
+    def values(self, row: Sequence[ValueType]) -> Sequence[ValueType]:
+        """
+        Values of columns @names from @row
+        """
+        values = row[self.start : self.end]
+
+        if self.sequence_offsets:
+            values = list(values)
+            for i in self.sequence_offsets:
+                if isinstance(values[i], list):
+                    values[i] = tuple(values[i])
+
+        return values
+
+    def create(self, row: Sequence[ValueType]) -> Tbl:
+        values = self.values(row)
+
+        if self.is_partial:
+            return self.class_.create_partial(zip(self.names, values))
+        return self.class_(*values)
+
+
+@dataclass(frozen=True)
+class FkStepDC:
+    """
+    Creates object of a table joined via @fkey from its part of row, and attaches it to primary object
+    """
+
+    fkey: ForeignKey
+    # Key in `Table._fk_values`
+    fk_values_key: str
+    is_back: bool
+
+    layout: TableLayoutDC
+
+    # Index of step, creating object to attach to (None for primary object)
+    parent_step: int | None = None
+
+
+@dataclass(frozen=True)
+class SelectPlanDC:
+    """
+    What `Table.select` selects, and how selected rows map to objects.
+    Built once per (class, join_on_fkeys), see `_select_plan`
+    """
+
+    all_columns: tuple[ColumnDC, ...]
+    join_clauses: tuple[JoinByClauseDC, ...]
+
+    primary: TableLayoutDC
+    fk_steps: tuple[FkStepDC, ...]
+
+    # `Table._fk_values` keys of `BackForeignKey` steps
+    back_fk_values_keys: tuple[str, ...]
+
+    def hydrate_row(
+        self,
+        row: Sequence[ValueType],
+        objs_dict: dict[ValueType, Tbl],
+        identity_map: IdentityMap,
+    ) -> Tbl:
+        """
+        Creates primary object (with foreign keys values) from selected @row,
+            or adds foreign keys values to already created one, if it's in @objs_dict
+
+        @param objs_dict: Primary objects of current query, by primary key, filled in
+        @param identity_map: Objects (primary & joined) are taken from it, if present,
+            and otherwise created & added to it
+
+        @return: object of primary table
+        """
+        objects = identity_map.objects
+        primary = self.primary
+        primary_key = row[primary.pk_offset]
+
+        obj = objs_dict.get(primary_key)
+        if obj is None:
+            identity_key = (primary.tablename, primary_key)
+
+            obj = objects.get(identity_key)
+            if obj is None:
+                obj = objects[identity_key] = primary.create(row)
+
+            objs_dict[primary_key] = obj
+
+            # Back foreign keys values are collected anew by every query
+            for fk_values_key in self.back_fk_values_keys:
+                obj._fk_values[fk_values_key] = []
+
+        # Objects created by steps, in order of steps
+        step_objs: list[Table | None] = []
+
+        for step in self.fk_steps:
+            parent_obj = obj if step.parent_step is None else step_objs[step.parent_step]
+
+            # No joined row: foreign key value is <null>, or there is no parent object at all
+            if parent_obj is None or row[step.layout.pk_offset] is None:
+                joined_obj = None
+            else:
+                joined_key = (step.layout.tablename, row[step.layout.pk_offset])
+
+                joined_obj = objects.get(joined_key)
+                if joined_obj is None:
+                    joined_obj = objects[joined_key] = step.layout.create(row)
+
+            step_objs.append(joined_obj)
+
+            if parent_obj is None:
+                continue
+
+            if step.is_back:
+                if joined_obj is not None:
+                    parent_obj._fk_values[step.fk_values_key].append(joined_obj)
+            else:
+                parent_obj._fk_values[step.fk_values_key] = joined_obj
+
+        return obj
+
+
+def _is_sequence_type(type_: Any) -> bool:
+    """
+    Whether column annotated with @type_ (f.e. `tuple[str] | None`) holds arrays
+    """
+    if isinstance(type_, types.UnionType):
+        return any(map(_is_sequence_type, typing.get_args(type_)))
+
+    return typing.get_origin(type_) in (tuple, list) or type_ in (tuple, list)
+
+
+@functools.cache
+def _select_plan(
+    class_: Type[Tbl],
+    join_on_fkeys: bool,
+    join_depth: int = 1,
+    only: frozenset[ColumnDC] | None = None,
+    defer: frozenset[ColumnDC] | None = None,
+) -> SelectPlanDC:
+    """
+    @param join_depth: Levels of foreign keys to join recursively,
+        f.e. 2 for answer -> question -> tg_user.
+        Each table is joined under its own name on first occurrence, and under alias "<table>_<n>" after.
+        `BackForeignKey`s are joined only on the 1st level (their values are reset by each query)
+
+    @param only, defer: Columns projection (see `_projected_names`)
+    """
+    primary_tablename: TableName = class_.Meta.tablename
+    primary_layout = TableLayoutDC.of(
+        class_, names=_projected_names(class_, primary_tablename, only, defer)
+    )
+
+    all_columns: list[ColumnDC] = [class_.column(x) for x in primary_layout.names]
+    join_clauses: list[JoinByClauseDC] = []
+    fk_steps: list[FkStepDC] = []
+
+    used_table_names: set[str] = {primary_tablename}
+
+    def add_joins(
+        parent_class: Type[Tbl],
+        parent_table_name: str,
+        parent_step: int | None,
+        depth: int,
+    ) -> None:
+        for fk_dataclass in parent_class.foreign_keys():
+            if isinstance(fk_dataclass, BackForeignKey) and parent_step is not None:
+                continue
+
+            join_class: Type[Tbl] = fk_dataclass.class_
+            join_tablename: TableName = join_class.Meta.tablename
+
+            join_table_name = join_tablename
+            if join_table_name in used_table_names:
+                join_table_name = f"{join_tablename}_{len(join_clauses) + 1}"
+            used_table_names.add(join_table_name)
+
+            join_clauses.append(
+                JoinByClauseDC(
+                    table_name=join_tablename,
+                    from_column=fk_dataclass.my_column,
+                    to_column=fk_dataclass.other_column,
+                    join_type=JoinTypes.LEFT,
+                    from_table=parent_table_name if parent_step is not None else None,
+                    alias=join_table_name if join_table_name != join_tablename else None,
+                )
+            )
+
+            layout = TableLayoutDC.of(
+                join_class,
+                start=len(all_columns),
+                names=_projected_names(join_class, join_table_name, only, defer),
+            )
+
+            fk_steps.append(
+                FkStepDC(
+                    fkey=fk_dataclass,
+                    fk_values_key=str(fk_dataclass),
+                    is_back=isinstance(fk_dataclass, BackForeignKey),
+                    layout=layout,
+                    parent_step=parent_step,
+                )
+            )
+
+            all_columns.extend(
+                ColumnDC(table_name=join_table_name, column_name=x) for x in layout.names
+            )
+
+            if depth > 1:
+                add_joins(join_class, join_table_name, len(fk_steps) - 1, depth - 1)
+
+    if join_on_fkeys:
+        add_joins(class_, primary_tablename, None, join_depth)
+
+    return SelectPlanDC(
+        all_columns=tuple(all_columns),
+        join_clauses=tuple(join_clauses),
+        primary=primary_layout,
+        fk_steps=tuple(fk_steps),
+        back_fk_values_keys=tuple(x.fk_values_key for x in fk_steps if x.is_back),
+    )
+
+
+def _projected_names(
+    class_: Type[Tbl],
+    table_name: str,
+    only: frozenset[ColumnDC] | None,
+    defer: frozenset[ColumnDC] | None,
+) -> tuple[str, ...]:
+    """
+    Columns of @class_, selected under @table_name (table name or its alias):
+        - if @only has columns of @table_name, only those are selected, otherwise all of them
+        - then columns of @table_name in @defer are excluded
+        - primary key is always selected
+    """
+    names: tuple[str, ...] = class_.__slots__
+    primary_key: str = class_.Meta.primary_key
+
+    only_names = {x.column_name for x in only or () if x.table_name == table_name}
+    defer_names = {x.column_name for x in defer or () if x.table_name == table_name}
+
+    if only_names:
+        names = tuple(x for x in names if x in only_names or x == primary_key)
+    if defer_names:
+        names = tuple(x for x in names if x not in defer_names or x == primary_key)
+
+    return names
+
+
 # slots=False to add availability for __setattr__ of new attribute
 @dataclass(frozen=True, slots=False)
 class Table:
     """
-    TODO cache objects with the same parameters
-    TODO https://stackoverflow.com/questions/73184156/return-cached-object-for-same-initialization-arguments
+    Objects with the same primary key can be shared between queries via `IdentityMap`
+        (see `identity_map` param of `select`)
     """
 
     def __post_init__(self):
         object.__setattr__(self, "_fk_values", {})
 
+    def __getattr__(self, name: str) -> ValueType:
+        """
+        Called only for attributes, which are not set, f.e. columns, not selected into partial object
+            (see `only`, `defer` of `select`).
+        Those are not loaded on access (it would be a hidden blocking query per object),
+            but only by explicit `load_deferred`
+        """
+        cls = type(self)
+        if name not in getattr(cls, "__dataclass_fields__", {}) or name == cls.Meta.primary_key:
+            raise AttributeError(f"'{cls.__name__}' object has no attribute '{name}'")
+
+        pk_value = object.__getattribute__(self, cls.Meta.primary_key)
+        raise AttributeError(
+            f"Column '{name}' of {cls.__name__}({cls.Meta.primary_key}={pk_value}) is not loaded, "
+            f"select it or call `load_deferred()`"
+        )
+
+    @classmethod
+    def create_partial(cls: Type[Tbl], values: Iterable[tuple[str, ValueType]]) -> Tbl:
+        """
+        Creates object with only some of columns set, from (<column name>, <value>) pairs
+        """
+        obj = cls.__new__(cls)
+
+        for name, value in values:
+            object.__setattr__(obj, name, value)
+        object.__setattr__(obj, "_fk_values", {})
+
+        return obj
+
+    def deferred_columns(self) -> list[str]:
+        """
+        Columns, not loaded into (partial) object yet
+        """
+        deferred: list[str] = []
+
+        for name in self.__slots__:
+            try:
+                object.__getattribute__(self, name)
+            except AttributeError:
+                deferred.append(name)
+
+        return deferred
+
+    def load_deferred(self) -> None:
+        """
+        Selects all of `deferred_columns` into object, by a single blocking query
+            (so not from event loop, see `base.run_sync`)
+        """
+        cls = type(self)
+        deferred = self.deferred_columns()
+        if not deferred:
+            return
+
+        primary_key: str = cls.Meta.primary_key
+        pk_value = object.__getattribute__(self, primary_key)
+
+        rows = base._select(
+            tablename=cls.Meta.tablename,
+            select_columns=[cls.column(x) for x in deferred],
+            where_clauses={cls.column(primary_key): pk_value},
+        )
+        if not rows:
+            raise Exception(f"Row {primary_key}={pk_value} of '{cls.Meta.tablename}' doesn't exist")
+
+        layout = TableLayoutDC.of(cls, names=(primary_key, *deferred))
+        for name, value in zip(deferred, layout.values((pk_value, *rows[0]))[1:]):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def column(cls, column_name: str) -> ColumnDC:
+        return ColumnDC(table_name=cls.Meta.tablename, column_name=column_name)
+
     @classmethod
     def dataclass_dict_to_row_dict(cls, d: dict[str, ValueType]) -> dict[ColumnDC, ValueType]:
         return {ColumnDC(table_name=cls.Meta.tablename, column_name=k): d[k] for k in d}
@@ -74,137 +457,151 @@ class Table:
             return existing_obj_list
         return None
 
+    @classmethod
+    def nullable_columns(cls, columns: Iterable[OrderByColumnType]) -> set[OrderByColumnType]:
+        """
+        Those of @columns, which can be NULL: declared in `Meta.nullable_columns`,
+            and columns of other (joined) tables, not known to be NOT NULL
+        """
+        return {
+            c
+            for c in columns
+            if isinstance(c, ColumnDC)
+            and (
+                c.table_name not in (None, cls.Meta.tablename)
+                or c.column_name in cls.Meta.nullable_columns
+            )
+        }
+
     @classmethod
     def select(
         cls: Type[Tbl],
         join_on_fkeys: bool = False,
-        where_clauses: dict[ColumnDC, ValueType] | None = None,
-        order_by_columns: list[ColumnDC] | None = None,
+        where_clauses: dict[ColumnDC, ValueType] | Predicate | None = None,
+        order_by_columns: list[OrderByColumnType] | None = None,
+        identity_map: IdentityMap | None = None,
+        join_depth: int = 1,
+        only: Iterable[ColumnDC] | None = None,
+        defer: Iterable[ColumnDC] | None = None,
+        after: Sequence[ValueType] | None = None,
+        limit: int | None = None,
     ) -> List[Tbl]:
-        def create_dataclass_instance(
-            class_to_create: Tbl,
-            columns_list: list[ColumnDC],
-            values_list: list[ValueType],
-        ) -> Tbl:
-            value_apply = lambda x: tuple(x) if isinstance(x, list) else x  # noqa: E731
-
-            return class_to_create(
-                **{
-                    columns_list[i].column_name: value_apply(values_list[i])
-                    for i in range(len(columns_list))
-                }
-            )
-
-        primary_tablename: TableName = cls.Meta.tablename
-        primary_table_columns: list[ColumnDC] = list(
-            map(
-                lambda x: ColumnDC(table_name=primary_tablename, column_name=x),
-                cls.__slots__,
+        """
+        @param identity_map: If given, objects (selected & joined) already in it are reused,
+            and new ones are added to it. Otherwise, objects are shared within this query only
+
+        @param join_depth: With @join_on_fkeys, how many levels of foreign keys to join,
+            f.e. with 2, `AnswerDB.question` has its `TgUserDB` set as well (see `_select_plan`)
+
+        @param only, defer: Columns projection, f.e. `only=[QuestionDB.column("name")]`:
+            for tables having columns in @only, only those are selected; columns in @defer are not selected.
+            Objects with some columns not selected are partial: those are loaded on first access.
+            Joined tables are identified by name (or alias, see `_select_plan`)
+
+        @param after, limit: Keyset pagination: only rows following the one with @after values
+            of @order_by_columns are selected (see `KeysetAfter`), up to @limit rows.
+            @order_by_columns have to identify row (f.e. end with primary key),
+            and @limit counts rows, so should be used without `BackForeignKey`s joins.
+            Pages are read by index on @order_by_columns, if none of them is nullable
+            (nullable ones can be ordered by `CoalesceDC` instead)
+        """
+        if after is not None:
+            if len(after) != len(order_by_columns or ()):
+                raise Exception(f"{after=} doesn't match {order_by_columns=}")
+
+            keyset_after = KeysetAfter(
+                order_by_columns, after, cls.nullable_columns(order_by_columns)
             )
+            if isinstance(where_clauses, dict):
+                where_clauses = Predicate.from_dict(where_clauses) if where_clauses else None
+            where_clauses = keyset_after & where_clauses if where_clauses else keyset_after
+
+        plan = _select_plan(
+            cls,
+            join_on_fkeys,
+            join_depth,
+            frozenset(only) if only else None,
+            frozenset(defer) if defer else None,
         )
 
-        all_columns: list[ColumnDC] = []
-        all_columns += primary_table_columns
-
-        # Stores mapping <join_tablename> : <ForeignKey obj>
-        # Auxiliary dict for faster finding ForeignKey instance
-        # Used on creating Dataclasses object on setting primary_class._fk_values (at the end of func)
-        auxiliary_table_fk_mapping: dict[TableName, ForeignKey] = {}
-
-        # Stores mapping <table_name> : (<column names list>)
-        auxiliary_table_columns_mapping: dict[TableName, list[ColumnDC]] = {
-            primary_tablename: primary_table_columns
-        }
+        query_results = base._select(
+            tablename=cls.Meta.tablename,
+            select_columns=list(plan.all_columns),
+            join_clauses=list(plan.join_clauses),
+            where_clauses=where_clauses,
+            order_by_columns=order_by_columns,
+            limit=limit,
+        )
 
-        join_clauses: list[JoinByClauseDC] | None = []
-        if join_on_fkeys and cls.foreign_keys():
-            for fk_dataclass in cls.foreign_keys():
-                # TODO Case: 2nd level of Foreign keys
-                "JOIN question_type qt ON q.type_id = qt.pk;"
-
-                join_table_name: TableName = fk_dataclass.class_.Meta.tablename
-
-                join_clauses.append(
-                    JoinByClauseDC(
-                        table_name=join_table_name,
-                        from_column=fk_dataclass.my_column,
-                        to_column=fk_dataclass.other_column,
-                        join_type=JoinTypes.LEFT,
-                    )
-                )
+        objs_dict: dict[ValueType, Tbl] = {}
+        if identity_map is None:
+            identity_map = IdentityMap(weak=False)
 
-                join_table_columns: list[ColumnDC] = list(
-                    map(
-                        lambda x: ColumnDC(table_name=join_table_name, column_name=x),
-                        fk_dataclass.class_.__slots__,
-                    )
-                )
+        hydrate_row = plan.hydrate_row
+        for row in query_results:
+            hydrate_row(row, objs_dict, identity_map)
 
-                all_columns += join_table_columns
+        return list(objs_dict.values())
 
-                auxiliary_table_fk_mapping[join_table_name] = fk_dataclass
-                auxiliary_table_columns_mapping[join_table_name] = join_table_columns
+    @classmethod
+    def iter_select(
+        cls: Type[Tbl],
+        join_on_fkeys: bool = False,
+        where_clauses: dict[ColumnDC, ValueType] | Predicate | None = None,
+        order_by_columns: list[OrderByColumnType] | None = None,
+        fetch_size: int = base.PG_STREAM_FETCH_SIZE,
+        identity_map: IdentityMap | None = None,
+        join_depth: int = 1,
+        only: Iterable[ColumnDC] | None = None,
+        defer: Iterable[ColumnDC] | None = None,
+    ) -> Iterator[Tbl]:
+        """
+        Same as `select`, but rows are streamed via server-side cursor by @fetch_size rows,
+            and objects are yielded one by one, so memory usage doesn't depend on rows count.
+
+        Rows of the same object (in case of `BackForeignKey` joins) are merged only if consecutive,
+            so @order_by_columns should keep them together.
+
+        @param identity_map: Better to be a weak one (default), so that consumed objects are evicted.
+            If not given, objects are shared within a chunk only
+        """
+        plan = _select_plan(
+            cls,
+            join_on_fkeys,
+            join_depth,
+            frozenset(only) if only else None,
+            frozenset(defer) if defer else None,
+        )
 
-        query_results = base._select(
-            tablename=primary_tablename,
-            select_columns=all_columns,
-            join_clauses=join_clauses,
+        chunks = base._select_stream(
+            tablename=cls.Meta.tablename,
+            select_columns=list(plan.all_columns),
+            join_clauses=list(plan.join_clauses),
             where_clauses=where_clauses,
             order_by_columns=order_by_columns,
+            fetch_size=fetch_size,
         )
 
-        objs_dict: dict[int, Tbl] = {}
+        # Only the object being currently built is kept
+        objs_dict: dict[ValueType, Tbl] = {}
+        current_obj: Tbl | None = None
 
-        row: list[ValueType]
-        for row in query_results:
-            primary_table_obj: cls = None
-
-            offset = 0
-            for table in auxiliary_table_columns_mapping:
-                table_selected_columns: list[ColumnDC] = auxiliary_table_columns_mapping[table]
-                columns_count = len(table_selected_columns)
-
-                values_for_table = row[offset : offset + columns_count]
-
-                # len(colnames) == len(values)
-                assert len(table_selected_columns) == len(values_for_table)
-
-                if table == primary_tablename:
-                    # creating Primary table instance
-                    primary_table_obj = create_dataclass_instance(
-                        cls, table_selected_columns, values_for_table
-                    )
-
-                    hash_int: int = primary_table_obj.__hash__()
-
-                    if hash_int in objs_dict:
-                        primary_table_obj = objs_dict[hash_int]
-                    else:
-                        objs_dict[hash_int] = primary_table_obj
-                else:
-                    # creating Dataclasses that are JOINED via fk
-                    assert primary_table_obj is not None
-                    fk_obj = auxiliary_table_fk_mapping[table]
-
-                    # Foreign key value is <null>
-                    if primary_table_obj.__getattribute__(fk_obj.my_column) is None:
-                        new_dataclass_obj = None
-                    else:
-                        new_dataclass_obj = create_dataclass_instance(
-                            fk_obj.class_, table_selected_columns, values_for_table
-                        )
-
-                    # TODO possibly merge set_fk_value & set_back_fk_value methods
-                    if isinstance(fk_obj, BackForeignKey):
-                        primary_table_obj.set_back_fk_value(fk_obj, new_dataclass_obj)
-                    elif isinstance(fk_obj, ForeignKey):
-                        primary_table_obj.set_fk_value(fk_obj, new_dataclass_obj)
-                    else:
-                        raise Exception
-
-                offset += columns_count
+        for chunk in chunks:
+            chunk_identity_map = (
+                identity_map if identity_map is not None else IdentityMap(weak=False)
+            )
 
-        return list(objs_dict.values())
+            for row in chunk:
+                obj = plan.hydrate_row(row, objs_dict, chunk_identity_map)
+
+                if current_obj is not None and obj is not current_obj:
+                    yield current_obj
+                    objs_dict = {row[plan.primary.pk_offset]: obj}
+
+                current_obj = obj
+
+        if current_obj is not None:
+            yield current_obj
 
     @classmethod
     def select_all(cls):
@@ -214,6 +611,151 @@ class Table:
             order_by_columns=[ColumnDC(table_name=cls.Meta.tablename, column_name="order_by")],
         )
 
+    @classmethod
+    def insert(
+        cls: Type[Tbl],
+        row_dict: dict[ColumnDC, ValueType],
+        identity_map: IdentityMap | None = None,
+    ) -> Tbl | None:
+        """
+        @param identity_map: Inserted object is added to it
+
+        @return: inserted row (with values assigned by DB, f.e. primary key),
+            as object of class (without Foreign keys values set),
+            or None if write is deferred by current `base.transaction()`
+        """
+        row = base._insert_row(
+            tablename=cls.Meta.tablename, row_dict=row_dict, returning_columns=cls.__slots__
+        )
+        if row is None:
+            return None
+
+        obj = cls.from_row(row)
+        if identity_map is not None:
+            identity_map.add(obj)
+
+        return obj
+
+    @classmethod
+    def update_or_insert(
+        cls: Type[Tbl],
+        where_clauses: dict[ColumnDC, ValueType],
+        set_dict: dict[ColumnDC, ValueType],
+        identity_map: IdentityMap | None = None,
+    ) -> Tbl | None:
+        """
+        Upserts row by one of table's unique constraints (`Meta.unique_constraints`),
+            which has to match @where_clauses columns.
+
+        @param identity_map: Stale object of written row (if any) is replaced in it by the new one
+
+        @return: written row, as object of class (without Foreign keys values set),
+            or None if write is deferred by current `base.transaction()`
+        """
+        cls._check_unique_constraint(where_clauses)
+
+        row = base.update_or_insert_row(
+            tablename=cls.Meta.tablename,
+            where_clauses=where_clauses,
+            set_dict=set_dict,
+            returning_columns=cls.__slots__,
+        )
+        if row is None:
+            return None
+
+        obj = cls.from_row(row)
+        if identity_map is not None:
+            identity_map.add(obj)
+
+        return obj
+
+    @classmethod
+    def update_or_insert_many(
+        cls: Type[Tbl],
+        rows: list[tuple[dict[ColumnDC, ValueType], dict[ColumnDC, ValueType]]],
+        identity_map: IdentityMap | None = None,
+    ) -> list[UpsertResultDC] | None:
+        """
+        Bulk `update_or_insert`: all @rows are written in one transaction
+
+        @param rows: List of (<where_clauses>, <set_dict>) pairs
+        @param identity_map: Same as in `update_or_insert`
+
+        @return: Per-row results (in order of @rows),
+            with `UpsertResultDC.row` being written object (None if skipped),
+            or None if writes are deferred by current `base.transaction()`
+        """
+        for where_clauses, _ in rows:
+            cls._check_unique_constraint(where_clauses)
+
+        results = base.update_or_insert_rows(
+            tablename=cls.Meta.tablename, rows=rows, returning_columns=cls.__slots__
+        )
+        if results is None:
+            return None
+
+        upsert_results = [
+            UpsertResultDC(
+                row=cls.from_row(res.row) if res.row is not None else None,
+                is_conflict=res.is_conflict,
+            )
+            for res in results
+        ]
+
+        if identity_map is not None:
+            for res in upsert_results:
+                if res.row is not None:
+                    identity_map.add(res.row)
+
+        return upsert_results
+
+    @classmethod
+    def _check_unique_constraint(cls, where_clauses: dict[ColumnDC, ValueType]) -> None:
+        where_columns: tuple[str, ...] = tuple(map(lambda x: x.column_name, where_clauses))
+
+        if set(where_columns) not in map(set, cls.Meta.unique_constraints):
+            raise Exception(
+                f"{where_columns} is not an unique constraint of '{cls.Meta.tablename}' table"
+            )
+
+    @classmethod
+    def select_changed_since(
+        cls, since: datetime.datetime | None
+    ) -> list[tuple[ValueType, datetime.datetime]]:
+        """
+        Finds rows modified after @since (all of them, if None), by `Meta.updated_at_column`.
+        Deleted rows can't be found this way.
+
+        @return: (<primary key>, <updated at>) of each row
+        """
+        if cls.Meta.updated_at_column is None:
+            raise Exception(f"'{cls.Meta.tablename}' table has no `updated_at_column`")
+
+        updated_at = cls.column(cls.Meta.updated_at_column)
+
+        return base._select(
+            tablename=cls.Meta.tablename,
+            select_columns=[cls.column(cls.Meta.primary_key), updated_at],
+            where_clauses=Gt(updated_at, since) if since is not None else None,
+        )
+
+    @classmethod
+    def select_pks(cls) -> list[ValueType]:
+        """
+        Primary keys of all rows (f.e. to find deleted ones, which `select_changed_since` can't)
+        """
+        rows = base._select(
+            tablename=cls.Meta.tablename, select_columns=[cls.column(cls.Meta.primary_key)]
+        )
+        return [x[0] for x in rows]
+
+    @classmethod
+    def from_row(cls: Type[Tbl], values: Sequence[ValueType]) -> Tbl:
+        """
+        Creates object from row values, selected in `cls.__slots__` order
+        """
+        return _select_plan(cls, False).primary.create(values)
+
     @classmethod
     def foreign_keys(cls) -> list[ForeignKey]:
         return cls.ForeignKeys.values_list()
@@ -221,5 +763,17 @@ class Table:
     class Meta:
         tablename: ClassVar[str] = None
 
+        # Column, identifying row (used to deduplicate selected objects)
+        primary_key: ClassVar[str] = "pk"
+
+        # Columns sets, each forming a UNIQUE constraint, f.e. [("date", "question_fk")]
+        unique_constraints: ClassVar[list[tuple[str, ...]]] = []
+
+        # Column, set to modification time of row (see `select_changed_since`)
+        updated_at_column: ClassVar[str | None] = None
+
+        # Columns, which can be NULL (f.e. to page by them, see `Table.nullable_columns`)
+        nullable_columns: ClassVar[list[str]] = []
+
     class ForeignKeys(MyEnum):
         pass
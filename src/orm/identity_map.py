@@ -0,0 +1,56 @@
+import weakref
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    MutableMapping,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from src.orm.dataclasses import (
+        Table,
+    )
+
+# (<tablename>, <primary key value>)
+IdentityKey = tuple[str, Any]
+
+
+class IdentityMap:
+    """
+    Objects by (tablename, primary key): while an object is in the map,
+        every query hydrating the same row gets this object instead of creating a new one.
+
+    By default objects are referenced weakly, and are evicted once nobody else references them.
+    Map doesn't track DB changes: after row is modified, it should be invalidated
+        (see `invalidate`, `clear`), otherwise stale object will keep being returned.
+    """
+
+    def __init__(self, weak: bool = True):
+        self.objects: MutableMapping[IdentityKey, "Table"] = (
+            weakref.WeakValueDictionary() if weak else {}
+        )
+
+    def get(self, class_: Type["Table"], pk: Any) -> "Table | None":
+        return self.objects.get((class_.Meta.tablename, pk))
+
+    def add(self, obj: "Table") -> None:
+        self.objects[(obj.Meta.tablename, getattr(obj, obj.Meta.primary_key))] = obj
+
+    def invalidate(self, class_: Type["Table"], pk: Any | None = None) -> None:
+        """
+        Evicts object of @class_ with primary key @pk, or all of @class_ objects if @pk is None
+        """
+        tablename = class_.Meta.tablename
+
+        if pk is not None:
+            self.objects.pop((tablename, pk), None)
+            return
+
+        for key in [key for key in list(self.objects.keys()) if key[0] == tablename]:
+            self.objects.pop(key, None)
+
+    def clear(self) -> None:
+        self.objects.clear()
+
+    def __len__(self) -> int:
+        return len(self.objects)
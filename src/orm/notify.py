@@ -0,0 +1,144 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import psycopg
+from psycopg.sql import (
+    SQL,
+    Identifier,
+)
+
+from src.orm import base
+from src.orm.retry import (
+    DEFAULT_RETRY_POLICY,
+    RetryPolicy,
+)
+
+# Channel, to which `sql/notify_triggers.sql` triggers send changed rows
+PG_NOTIFY_CHANNEL = os.environ.get("PG_NOTIFY_CHANNEL", "table_change")
+
+# `TableChangeDC.tablename` of change, meaning that anything could have changed
+#   (sent after listener reconnects, as notifications are lost while it's disconnected)
+ALL_TABLES = "*"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TableChangeDC:
+    tablename: str
+    # "INSERT" / "UPDATE" / "DELETE"
+    operation: str
+    # Primary keys of changed rows, None if too many rows changed (whole table should be reloaded)
+    pks: tuple[Any, ...] | None
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "TableChangeDC":
+        data = json.loads(payload)
+        pks = data.get("pks")
+
+        return cls(
+            tablename=data["table"],
+            operation=data["op"],
+            pks=tuple(pks) if pks is not None else None,
+        )
+
+
+ChangesHandler = Callable[[list[TableChangeDC]], None]
+
+
+class ChangeListener:
+    """
+    Listens to @channel on a dedicated connection (`LISTEN` needs the same session all the time,
+        so it's not taken from the pool), running on the pool loop.
+
+    Notifications, arrived while handlers were busy, are coalesced and passed to handlers as one list.
+    Handlers are sync (they may query DB via sync shims), and are called in a worker thread.
+
+    On lost connection, listener reconnects (with @policy delays), and sends `ALL_TABLES` change,
+        as notifications sent meanwhile are lost.
+    """
+
+    def __init__(
+        self, channel: str = PG_NOTIFY_CHANNEL, policy: RetryPolicy = DEFAULT_RETRY_POLICY
+    ):
+        self.channel = channel
+        self.policy = policy
+
+        self.handlers: list[ChangesHandler] = []
+
+        self._future: concurrent.futures.Future | None = None
+        # Failed connection attempts in a row
+        self._failures = 0
+
+    def add_handler(self, handler: ChangesHandler) -> None:
+        if handler not in self.handlers:
+            self.handlers.append(handler)
+
+    @property
+    def is_running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._future = base._submit(self._run())
+
+    def stop(self) -> None:
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    async def _run(self) -> None:
+        queue: asyncio.Queue[TableChangeDC] = asyncio.Queue()
+        dispatcher = asyncio.create_task(self._dispatch(queue))
+
+        self._failures = 0
+        try:
+            while True:
+                try:
+                    await self._listen(queue)
+                except (psycopg.OperationalError, OSError) as exc:
+                    delay = self.policy.delay(min(self._failures, self.policy.attempts))
+                    logger.warning(
+                        f"Notifications listener disconnected ({exc}), reconnecting in {delay:.2f}s"
+                    )
+
+                    self._failures += 1
+                    await asyncio.sleep(delay)
+        finally:
+            dispatcher.cancel()
+
+    async def _listen(self, queue: asyncio.Queue[TableChangeDC]) -> None:
+        conn = await psycopg.AsyncConnection.connect(base._pool_conninfo(), autocommit=True)
+
+        async with conn:
+            await conn.execute(SQL("LISTEN {}").format(Identifier(self.channel)))
+
+            if self._failures:
+                queue.put_nowait(TableChangeDC(tablename=ALL_TABLES, operation="", pks=None))
+                self._failures = 0
+
+            async for notify in conn.notifies():
+                try:
+                    queue.put_nowait(TableChangeDC.from_payload(notify.payload))
+                except (ValueError, KeyError):
+                    logger.error(f"Bad notification payload: {notify.payload!r}")
+
+    async def _dispatch(self, queue: asyncio.Queue[TableChangeDC]) -> None:
+        while True:
+            changes = [await queue.get()]
+            while not queue.empty():
+                changes.append(queue.get_nowait())
+
+            for handler in list(self.handlers):
+                try:
+                    await asyncio.to_thread(handler, changes)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    logger.exception(f"Changes handler {handler} failed")
+
+
+change_listener = ChangeListener()
@@ -0,0 +1,148 @@
+import enum
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+
+import psycopg
+from psycopg_pool import (
+    PoolTimeout,
+)
+
+PG_RETRY_ATTEMPTS = int(os.environ.get("PG_RETRY_ATTEMPTS", "3"))
+PG_RETRY_BASE_DELAY = float(os.environ.get("PG_RETRY_BASE_DELAY", "0.2"))
+PG_RETRY_MAX_DELAY = float(os.environ.get("PG_RETRY_MAX_DELAY", "5"))
+
+# Number of consecutive failed queries, after which circuit is opened
+PG_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("PG_CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds, for which queries fail fast, before a trial query is let through
+PG_CIRCUIT_RESET_TIMEOUT = float(os.environ.get("PG_CIRCUIT_RESET_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(psycopg.OperationalError):
+    """
+    Raised instead of executing query, while circuit breaker is open (DB considered down)
+    """
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """
+    Connection is lost / can't be established: a new one is needed to retry
+    """
+    if isinstance(exc, PoolTimeout):
+        return True
+
+    if isinstance(exc, psycopg.OperationalError) and not isinstance(
+        exc, psycopg.errors.QueryCanceled
+    ):
+        # Errors with SQLSTATE are reported by a working server (f.e. AdminShutdown is "57P01")
+        return exc.sqlstate is None or exc.sqlstate.startswith("08") or exc.sqlstate == "57P01"
+
+    return False
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Error, after which the same query may succeed if retried.
+    Everything else (constraint violations, syntax errors, ...) is permanent, and is raised at once
+    """
+    if is_connection_error(exc):
+        return True
+
+    return isinstance(
+        exc,
+        (
+            psycopg.errors.SerializationFailure,
+            psycopg.errors.DeadlockDetected,
+            psycopg.errors.LockNotAvailable,
+            psycopg.errors.InFailedSqlTransaction,
+            psycopg.errors.CannotConnectNow,
+            psycopg.errors.TooManyConnections,
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = PG_RETRY_ATTEMPTS
+    base_delay: float = PG_RETRY_BASE_DELAY
+    max_delay: float = PG_RETRY_MAX_DELAY
+
+    def delay(self, attempt: int) -> float:
+        """
+        Exponential backoff with "full jitter": random value in [0, base_delay * 2^attempt]
+        """
+        exp_delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return random.uniform(0, exp_delay)  # nosec B311
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitState(enum.Enum):
+    CLOSED = 0  # Queries are executed as usual
+    OPEN = 1  # DB is considered down, queries fail fast with `CircuitOpenError`
+    HALF_OPEN = 2  # Reset timeout passed, single trial query is let through
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failed queries (failed with transient errors, after all retries).
+    On reaching `failure_threshold`, opens for `reset_timeout` seconds,
+        then lets one trial query through: its success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = PG_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = PG_CIRCUIT_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures_count = 0
+        self.opened_at: float | None = None
+        self.is_trial_running = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self.opened_at is None:
+            return CircuitState.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def before_call(self) -> None:
+        state = self.state
+
+        if state is CircuitState.OPEN or (
+            state is CircuitState.HALF_OPEN and self.is_trial_running
+        ):
+            raise CircuitOpenError(
+                f"DB circuit is open after {self.failures_count} failures, failing fast"
+            )
+
+        if state is CircuitState.HALF_OPEN:
+            self.is_trial_running = True
+
+    def on_success(self) -> None:
+        if self.opened_at is not None:
+            logger.warning("DB circuit closed")
+
+        self.failures_count = 0
+        self.opened_at = None
+        self.is_trial_running = False
+
+    def on_failure(self) -> None:
+        self.failures_count += 1
+        self.is_trial_running = False
+
+        if self.opened_at is not None or self.failures_count >= self.failure_threshold:
+            logger.error(f"DB circuit opened for {self.reset_timeout}s")
+            self.opened_at = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,8 @@
+-- Index of answers order (see `AnswerDB._order_by_columns`): `AnswerDB.select_page` reads pages
+-- from it, by "(date, COALESCE(time, '24:00'::time), pk) > (...)" bound, without sorting.
+-- NULL time goes last, as "24:00" is later than any time of day.
+-- Safe to run on existing DB.
+
+ALTER TABLE answer ALTER COLUMN date SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS answer_order_idx ON answer (date, COALESCE(time, '24:00'::time), pk);
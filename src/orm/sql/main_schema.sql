@@ -44,7 +44,10 @@ CREATE TABLE question(
 --             ON DELETE SET DEFAULT,
     is_activated BOOLEAN
         DEFAULT True
-        NOT NULL
+        NOT NULL,
+
+    updated_at TIMESTAMPTZ
+        NOT NULL DEFAULT clock_timestamp()
 );
 
 
@@ -64,7 +67,10 @@ CREATE TABLE event(
     is_activated BOOLEAN
         NOT NULL DEFAULT True,
 
-    order_by SERIAL
+    order_by SERIAL,
+
+    updated_at TIMESTAMPTZ
+        NOT NULL DEFAULT clock_timestamp()
 );
 
 
@@ -72,7 +78,7 @@ CREATE TABLE event(
 CREATE TABLE answer (
     pk SERIAL PRIMARY KEY ,
     date DATE
-        DEFAULT now()::date,
+        NOT NULL DEFAULT now()::date,
     event_fk INTEGER
         REFERENCES event,
     question_fk INTEGER
@@ -85,6 +91,10 @@ CREATE TABLE answer (
     time TIME NULL, -- DEFAULT now()::time,
     text TEXT NULL,
 
+    -- Set on update by trigger, see `updated_at.sql`
+    updated_at TIMESTAMPTZ
+        NOT NULL DEFAULT clock_timestamp(),
+
     CONSTRAINT answer_is_time_for_event CHECK (
         ((event_fk IS NOT NULL) AND (time IS NOT NULL))  OR
 --         ((answer.lasting_event_fk IS NOT NULL) AND (time IS NOT NULL)) OR
@@ -99,3 +109,6 @@ CREATE TABLE answer (
         = 1
     )
 );
+
+-- Order of `AnswerDB.select_all` / pages of `AnswerDB.select_page` (NULL time goes last)
+CREATE INDEX answer_order_idx ON answer (date, COALESCE(time, '24:00'::time), pk);
@@ -0,0 +1,70 @@
+
+-- Notifications about changed rows of `question`, `event`, `answer` (see `orm/notify.py`).
+--
+-- On every modifying statement, a single NOTIFY is sent to channel 'table_change', with json payload:
+--     {"table": "<table name>", "op": "INSERT" | "UPDATE" | "DELETE", "pks": [<pk>, ...]}
+-- NOTIFY payload is limited (8000 bytes), so if too many rows are changed, "pks" is null:
+--     everything of the table has to be reloaded.
+-- Notifications are delivered on commit (and are not, if transaction is rolled back).
+
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS TRIGGER AS $$
+DECLARE
+    pks INTEGER[];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT array_agg(pk) INTO pks FROM old_rows;
+    ELSE
+        SELECT array_agg(pk) INTO pks FROM new_rows;
+    END IF;
+
+    -- Statement changed no rows
+    IF pks IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF array_length(pks, 1) > 500 THEN
+        pks := NULL;
+    END IF;
+
+    PERFORM pg_notify(
+        'table_change',
+        json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'pks', pks)::TEXT
+    );
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Statement-level triggers (one notification per statement, f.e. per `executemany` batch item),
+--     transition tables can't be shared by INSERT / UPDATE / DELETE, hence 3 triggers per table
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['question', 'event', 'answer'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %1$s_notify_insert ON %1$I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %1$s_notify_update ON %1$I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %1$s_notify_delete ON %1$I', t);
+
+        EXECUTE format(
+            'CREATE TRIGGER %1$s_notify_insert AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()',
+            t
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %1$s_notify_update AFTER UPDATE ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()',
+            t
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %1$s_notify_delete AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()',
+            t
+        );
+    END LOOP;
+END;
+$$;
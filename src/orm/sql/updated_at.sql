@@ -0,0 +1,33 @@
+
+-- Modification time of `question`, `event`, `answer` rows (see `Table.select_changed_since`).
+-- Safe to run on existing DB: adds column, if it's missing.
+
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    -- Not `now()` (start of transaction): rows are found by time they're written, close to commit
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['question', 'event', 'answer'] LOOP
+        EXECUTE format(
+            'ALTER TABLE %1$I ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()',
+            t
+        );
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %1$s_updated_at_idx ON %1$I (updated_at)', t);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %1$s_set_updated_at ON %1$I', t);
+        EXECUTE format(
+            'CREATE TRIGGER %1$s_set_updated_at BEFORE UPDATE ON %1$I '
+            'FOR EACH ROW EXECUTE FUNCTION set_updated_at()',
+            t
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,179 @@
+import bisect
+import collections
+import contextlib
+import datetime
+import logging
+import os
+import threading
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Any, Iterator
+
+# Queries running longer are logged & kept in `QueryStats.slow_queries`
+PG_SLOW_QUERY_MS = float(os.environ.get("PG_SLOW_QUERY_MS", "500"))
+PG_SLOW_QUERIES_KEPT = int(os.environ.get("PG_SLOW_QUERIES_KEPT", "50"))
+# Count bytes of fetched values (walks over every fetched value on the pool loop, so it's off by default)
+PG_STATS_TRACK_BYTES = os.environ.get("PG_STATS_TRACK_BYTES", "0") == "1"
+
+# Upper bounds of latency histogram buckets, the last one is for everything slower
+LATENCY_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryMeasureDC:
+    """
+    Filled in by query executor, inside of `QueryStats.measure` context
+    """
+
+    rows: int = 0
+    bytes_fetched: int = 0
+
+
+@dataclass
+class QueryShapeStatsDC:
+    sql: str
+
+    calls: int = 0
+    errors: int = 0
+
+    total_ms: float = 0
+    max_ms: float = 0
+
+    rows: int = 0
+    bytes_fetched: int = 0
+
+    # Count of calls by latency, see `LATENCY_BUCKETS_MS`
+    latency_histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    )
+
+    def record(self, duration_ms: float, measure: QueryMeasureDC, is_error: bool):
+        self.calls += 1
+        self.errors += int(is_error)
+
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+        self.rows += measure.rows
+        self.bytes_fetched += measure.bytes_fetched
+
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0
+
+    def as_dict(self) -> dict[str, Any]:
+        bucket_names = [f"<={x}ms" for x in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.avg_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "bytes_fetched": self.bytes_fetched,
+            "latency_histogram": dict(zip(bucket_names, self.latency_histogram)),
+        }
+
+
+@dataclass(frozen=True)
+class SlowQueryDC:
+    sql: str
+    # Only for `base.explain_slow_query`: values are users' data, so they're not exported by `as_dict`
+    params: Any
+    duration_ms: float
+    timestamp: datetime.datetime
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "duration_ms": round(self.duration_ms, 3),
+            "timestamp": self.timestamp.isoformat(sep=" ", timespec="seconds"),
+        }
+
+
+class QueryStats:
+    """
+    Per query shape (sql template with placeholders) aggregates, and slow queries log.
+
+    Recorded from the pool loop thread, read from any other, hence the lock.
+    """
+
+    def __init__(self, slow_query_ms: float = PG_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+
+        self.shapes: dict[str, QueryShapeStatsDC] = {}
+        self.slow_queries: collections.deque[SlowQueryDC] = collections.deque(
+            maxlen=PG_SLOW_QUERIES_KEPT
+        )
+
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, sql: str, params: Any) -> Iterator[QueryMeasureDC]:
+        measure = QueryMeasureDC()
+        is_error = False
+
+        start = time.perf_counter()
+        try:
+            yield measure
+        except BaseException:
+            is_error = True
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.record(sql, params, duration_ms, measure, is_error)
+
+    def record(
+        self, sql: str, params: Any, duration_ms: float, measure: QueryMeasureDC, is_error: bool
+    ):
+        with self._lock:
+            shape_stats = self.shapes.get(sql)
+            if shape_stats is None:
+                shape_stats = self.shapes[sql] = QueryShapeStatsDC(sql=sql)
+
+            shape_stats.record(duration_ms, measure, is_error)
+
+            if duration_ms >= self.slow_query_ms:
+                self.slow_queries.append(
+                    SlowQueryDC(
+                        sql=sql,
+                        params=params,
+                        duration_ms=duration_ms,
+                        timestamp=datetime.datetime.now(),
+                    )
+                )
+
+        if duration_ms >= self.slow_query_ms:
+            logger.warning(f"Slow query ({duration_ms:.1f}ms): {sql}")
+
+    def top_shapes(self, n: int = 10) -> list[QueryShapeStatsDC]:
+        """
+        Most expensive shapes, by total time spent
+        """
+        with self._lock:
+            return sorted(self.shapes.values(), key=lambda x: x.total_ms, reverse=True)[:n]
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "slow_query_ms": self.slow_query_ms,
+                "shapes": [x.as_dict() for x in self.shapes.values()],
+                "slow_queries": [x.as_dict() for x in self.slow_queries],
+            }
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+            self.slow_queries.clear()
+
+
+query_stats = QueryStats()
@@ -1,3 +1,5 @@
+import asyncio
+import html
 from dataclasses import dataclass
 from typing import (
     Callable,
@@ -18,21 +20,34 @@ from src.conversations.ask_utils import (
     build_transpose_callback_data,
     send_entity_answers_df,
 )
+from src.orm import base
+from src.orm.notify import (
+    change_listener,
+)
+from src.orm.retry import (
+    circuit_breaker,
+)
+from src.orm.stats import (
+    query_stats,
+)
 from src.tables.answer import (
     AnswerType,
 )
 from src.user_data import (
     UserData,
-    UserDBCache,
+    db_cache_registry,
+    on_db_changes,
 )
 from src.utils import (
     MyEnum,
+    MyException,
     format_datetime,
     get_now,
 )
 from src.utils_tg import (
     USER_DATA_KEY,
     handler_decorator,
+    wrapped_send_text,
 )
 
 
@@ -67,8 +82,16 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ("User id", update.effective_user.id),
         ("Time on server", cur_time),
         ("DB last reload", format_datetime(ud.db_cache.LAST_RELOAD_TIME)),
+        (
+            "DB last change",
+            format_datetime(ud.db_cache.LAST_CHANGE_TIME) if ud.db_cache.LAST_CHANGE_TIME else "-",
+        ),
+        ("DB changes listener", change_listener.is_running),
+        ("DB caches", len(db_cache_registry)),
         ("DEBUG_SQL_OUTPUT", ud.DEBUG_SQL_OUTPUT),
         ("DEBUG_ERRORS_OUTPUT", ud.DEBUG_ERRORS_OUTPUT),
+        ("DB circuit", circuit_breaker.state.name),
+        ("DB failures in row", circuit_breaker.failures_count),
         ("", ""),
         ("Questions entries", len(ud.db_cache.questions)),
         ("Events entries", len(ud.db_cache.events)),
@@ -96,6 +119,63 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(text=text, parse_mode=ParseMode.MARKDOWN)
 
 
+@handler_decorator
+async def dbstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /dbstats                        - per query shape aggregates & latest slow queries
+    /dbstats explain [i] [analyze]  - plan of i-th slow query (latest by default)
+    /dbstats reset                  - reset collected stats
+    """
+    args = context.args or []
+
+    if args and args[0] == "reset":
+        query_stats.reset()
+        await update.message.reply_text(text="DB stats reset")
+        return
+
+    if args and args[0] == "explain":
+        if not query_stats.slow_queries:
+            raise MyException("No slow queries recorded")
+
+        index = int(args[1]) if len(args) > 1 and args[1].lstrip("-").isdigit() else -1
+        if not -len(query_stats.slow_queries) <= index < len(query_stats.slow_queries):
+            raise MyException(f"No slow query #{index}")
+        analyze = "analyze" in args
+
+        plan = await asyncio.to_thread(base.explain_slow_query, index, analyze)
+        text = f"<pre>{html.escape(plan)}</pre>"
+    else:
+        text_lines = ["=== DB STATS ===", ""]
+
+        for name, value in base.pool_stats().items():
+            text_lines.append(f"{name:<20}: {value}")
+        for name, cache_info in base.statement_cache_info().items():
+            text_lines.append(
+                f"{'cache ' + name:<20}: {cache_info.hits} hits, {cache_info.misses} misses"
+            )
+
+        text_lines += ["", f"=== TOP QUERIES (slow: >={query_stats.slow_query_ms}ms) ==="]
+        for shape in query_stats.top_shapes(10):
+            text_lines += [
+                "",
+                shape.sql[:200],
+                f"calls: {shape.calls}, errors: {shape.errors}, rows: {shape.rows}, "
+                f"bytes: {shape.bytes_fetched}",
+                f"avg: {shape.avg_ms:.1f}ms, max: {shape.max_ms:.1f}ms, total: {shape.total_ms:.1f}ms",
+            ]
+
+        slow_queries = list(query_stats.slow_queries)
+
+        text_lines += ["", f"=== SLOW QUERIES ({len(slow_queries)}) ==="]
+        for i, slow_query in list(enumerate(slow_queries))[-10:]:
+            text_lines.append(f"[{i}] {slow_query.duration_ms:.1f}ms: {slow_query.sql[:100]}")
+
+        text = "\n".join(text_lines)
+        text = f"<pre>{html.escape(text)}</pre>"
+
+    await wrapped_send_text(update.message.reply_text, text=text, parse_mode=ParseMode.HTML)
+
+
 @handler_decorator
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ud: UserData = context.chat_data[USER_DATA_KEY]
@@ -109,7 +189,7 @@ async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ud: UserData = context.chat_data[USER_DATA_KEY]
 
     await update.message.reply_text(text="Reloading from DB...")
-    ud.db_cache.reload_all()
+    await asyncio.to_thread(ud.db_cache.reload_all)
     await update.message.reply_text(text="Done")
 
 
@@ -146,6 +226,7 @@ async def on_callback_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
 class TgCommands(MyEnum):
     STATS = TgCommand("stats", stats_command, "Get questions/events stats")
     INFO = TgCommand("info", info_command, "Get bot debug info")
+    DBSTATS = TgCommand("dbstats", dbstats_command, "Get DB queries stats")
     ASK = TgCommand("ask", None, "Ask for Question[s] or Event")
     CANCEL = TgCommand("cancel", cancel_command, "Cancel current /ask conversation")
     RELOAD = TgCommand("reload", reload_command, "Reset cache and reload entries data from DB")
@@ -154,10 +235,15 @@ class TgCommands(MyEnum):
 async def post_init(application: Application) -> None:
     print(await application.bot.get_me())
 
+    # Chats share caches (see `UserDBCacheRegistry`), so each one is loaded once
     for _, chat_data in application.chat_data.items():
-        ud: UserData = chat_data[USER_DATA_KEY]
-        # ud.db_cache.reload_all()
-        ud.db_cache = UserDBCache()
+        ud: UserData | None = chat_data.get(USER_DATA_KEY)
+        if ud is not None and ud.db_cache_handle is not None:
+            await asyncio.to_thread(getattr, ud.db_cache_handle, "cache")
+
+    # Caches are updated in place on changes made by anyone (see `orm/sql/notify_triggers.sql`)
+    change_listener.add_handler(on_db_changes)
+    await asyncio.to_thread(change_listener.start)
 
     commands_names_desc = [(x.name, x.description) for x in TgCommands.values_list()]
     await application.bot.set_my_commands(commands_names_desc)
@@ -1,12 +1,25 @@
 import datetime
 import pprint
 from dataclasses import dataclass
+from typing import (
+    Iterable,
+    Iterator,
+)
 
-from src.orm.base import ColumnDC
+from src.orm.base import (
+    CoalesceDC,
+    ColumnDC,
+    Ge,
+    IsNotNull,
+    Predicate,
+)
 from src.orm.dataclasses import (
     ForeignKey,
     Table,
 )
+from src.orm.identity_map import (
+    IdentityMap,
+)
 from src.tables.event import (
     EventDB,
 )
@@ -14,6 +27,8 @@ from src.tables.question import (
     QuestionDB,
 )
 
+ANSWERS_PAGE_SIZE = 500
+
 
 @dataclass(frozen=True, slots=True)
 class AnswerDB(Table):
@@ -28,6 +43,8 @@ class AnswerDB(Table):
     time: datetime.time
     text: str
 
+    updated_at: datetime.datetime
+
     @property
     def question(self) -> QuestionDB | None:
         # return self.get_fk_value("question_fk")
@@ -38,24 +55,126 @@ class AnswerDB(Table):
         # return self.get_fk_value("event_fk")
         return self.get_fk_value(AnswerType.EVENT.value)
 
+    @classmethod
+    def select_events_answers(cls, date_from: datetime.date | None = None) -> list["AnswerDB"]:
+        """
+        Answers on Events only, optionally starting from @date_from (inclusive)
+        """
+        return cls.select_all(where_clauses=cls._events_answers_where(date_from))
+
+    @classmethod
+    def iter_events_answers(cls, date_from: datetime.date | None = None) -> Iterator["AnswerDB"]:
+        """
+        Streamed version of `select_events_answers`
+        """
+        return cls.iter_select(
+            join_on_fkeys=True,
+            where_clauses=cls._events_answers_where(date_from),
+            order_by_columns=cls._order_by_columns(),
+            only=FK_NAMES_ONLY,
+        )
+
+    @classmethod
+    def _events_answers_where(cls, date_from: datetime.date | None) -> Predicate:
+        where_clauses: Predicate = IsNotNull(cls.column("event_fk"))
+
+        if date_from is not None:
+            where_clauses &= Ge(cls.column("date"), date_from)
+
+        return where_clauses
+
     def get_timestamp(self) -> datetime.datetime:
         return datetime.datetime.combine(date=self.date, time=self.time)
 
     @classmethod
-    def select_all(cls):
+    def select_all(
+        cls,
+        where_clauses: Predicate | None = None,
+        identity_map: IdentityMap | None = None,
+        only: Iterable[ColumnDC] | None = None,
+    ):
+        return cls.select(
+            join_on_fkeys=True,
+            where_clauses=where_clauses,
+            identity_map=identity_map,
+            order_by_columns=cls._order_by_columns(),
+            only=only,
+        )
+
+    @classmethod
+    def select_page(
+        cls,
+        after: tuple[datetime.date, datetime.time | None, int] | None = None,
+        limit: int = ANSWERS_PAGE_SIZE,
+        where_clauses: Predicate | None = None,
+        identity_map: IdentityMap | None = None,
+    ) -> list["AnswerDB"]:
+        """
+        Page of answers, in `select_all` order
+
+        @param after: (date, time, pk) of the last answer of previous page (see `page_key`),
+            None for the first page
+        """
         return cls.select(
             join_on_fkeys=True,
-            where_clauses=None,
-            order_by_columns=[
-                ColumnDC(table_name=cls.Meta.tablename, column_name="date"),
-                ColumnDC(table_name=cls.Meta.tablename, column_name="time"),
-                # ColumnDC(table_name="question", column_name="order_by"),
-            ],
+            where_clauses=where_clauses,
+            identity_map=identity_map,
+            order_by_columns=cls._order_by_columns(),
+            after=after,
+            limit=limit,
         )
 
+    @classmethod
+    def iter_pages(
+        cls,
+        page_size: int = ANSWERS_PAGE_SIZE,
+        where_clauses: Predicate | None = None,
+        after: tuple[datetime.date, datetime.time | None, int] | None = None,
+    ) -> Iterator[list["AnswerDB"]]:
+        """
+        Walks answers page by page: each page is a separate query, continuing after the previous one
+        """
+        while True:
+            page = cls.select_page(after=after, limit=page_size, where_clauses=where_clauses)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+
+            after = page[-1].page_key()
+
+    def page_key(self) -> tuple[datetime.date, datetime.time | None, int]:
+        """
+        `after` param of `select_page` for the page following this answer
+        """
+        return self.date, self.time, self.pk
+
+    def sort_key(self) -> tuple[datetime.date, bool, datetime.time, int]:
+        """
+        Key of `select_all` order, for sorting answers in memory (NULL time goes last, as in PostgreSQL)
+        """
+        return self.date, self.time is None, self.time or datetime.time(), self.pk
+
+    @classmethod
+    def _order_by_columns(cls) -> list[ColumnDC | CoalesceDC]:
+        # Matches "answer_order_idx" index (see `sql/answer_order_idx.sql`),
+        #   NULL time goes last, as it's NULLS LAST by default
+        return [
+            ColumnDC(table_name=cls.Meta.tablename, column_name="date"),
+            CoalesceDC(
+                ColumnDC(table_name=cls.Meta.tablename, column_name="time"), "'24:00'::time"
+            ),
+            # ColumnDC(table_name="question", column_name="order_by"),
+            # Makes order unique, as needed by keyset pagination (see `select_page`)
+            ColumnDC(table_name=cls.Meta.tablename, column_name="pk"),
+        ]
+
     class Meta(Table.Meta):
         # foreign_keys = AnswerType.values_list()
         tablename = "answer"
+        unique_constraints = [("date", "question_fk")]
+        updated_at_column = "updated_at"
+        nullable_columns = ["event_fk", "question_fk", "time", "text"]
 
     class ForeignKeys(Table.ForeignKeys):
         QUESTION = ForeignKey(QuestionDB, "question_fk", "pk")
@@ -64,6 +183,10 @@ class AnswerDB(Table):
 
 AnswerType = AnswerDB.ForeignKeys
 
+# Projection for `AnswerDB.select(only=...)`: of joined questions & events only names are read
+#   by stats, metrics & ics (other columns are loaded on access)
+FK_NAMES_ONLY: tuple[ColumnDC, ...] = (QuestionDB.column("name"), EventDB.column("name"))
+
 
 if __name__ == "__main__":
     answers = AnswerDB.select(
@@ -1,10 +1,18 @@
+import datetime
 from dataclasses import dataclass
 
-from src.orm.base import ColumnDC
+from src.orm.base import (
+    ColumnDC,
+    Eq,
+    Predicate,
+)
 from src.orm.dataclasses import (
     ForeignKey,
     Table,
 )
+from src.orm.identity_map import (
+    IdentityMap,
+)
 from src.tables.tg_user import (
     TgUserDB,
 )
@@ -24,13 +32,23 @@ class EventDB(Table):
 
     type: str
 
+    updated_at: datetime.datetime
+
     @classmethod
-    def select_all(cls):
+    def select_all(
+        cls, where_clauses: Predicate | None = None, identity_map: IdentityMap | None = None
+    ):
+        """
+        Activated events, in `order_by` order
+
+        @param where_clauses: Additional condition, f.e. on primary keys to select only some of them
+        """
+        activated: Predicate = Eq(cls.column("is_activated"), True)
+
         return cls.select(
             join_on_fkeys=True,
-            where_clauses={
-                ColumnDC(table_name=cls.Meta.tablename, column_name="is_activated"): True
-            },
+            identity_map=identity_map,
+            where_clauses=activated if where_clauses is None else activated & where_clauses,
             order_by_columns=[ColumnDC(table_name=cls.Meta.tablename, column_name="order_by")],
         )
 
@@ -45,6 +63,8 @@ class EventDB(Table):
 
     class Meta(Table.Meta):
         tablename = "event"
+        unique_constraints = [("name",)]
+        updated_at_column = "updated_at"
 
     class ForeignKeys(Table.ForeignKeys):
         USER_ID = ForeignKey(TgUserDB, "user_id", "user_id")
@@ -7,11 +7,18 @@ from src.conversations.ask_constants import (
     BINARY_CHOICE_YES,
     TIME_CHOICE_NOW,
 )
-from src.orm.base import ColumnDC
+from src.orm.base import (
+    ColumnDC,
+    Eq,
+    Predicate,
+)
 from src.orm.dataclasses import (
     ForeignKey,
     Table,
 )
+from src.orm.identity_map import (
+    IdentityMap,
+)
 from src.tables.tg_user import (
     TgUserDB,
 )
@@ -99,6 +106,8 @@ class QuestionDB(Table):
 
     type_id: int
 
+    updated_at: datetime.datetime
+
     @property
     def question_type(self) -> QuestionTypeEntity:
         return QuestionTypeEnum.values_list()[self.type_id]
@@ -119,17 +128,27 @@ class QuestionDB(Table):
         return "<code>" + "\n".join(lines) + "</code>"
 
     @classmethod
-    def select_all(cls):
+    def select_all(
+        cls, where_clauses: Predicate | None = None, identity_map: IdentityMap | None = None
+    ):
+        """
+        Activated questions, in `order_by` order
+
+        @param where_clauses: Additional condition, f.e. on primary keys to select only some of them
+        """
+        activated: Predicate = Eq(cls.column("is_activated"), True)
+
         return cls.select(
             join_on_fkeys=True,
-            where_clauses={
-                ColumnDC(table_name=cls.Meta.tablename, column_name="is_activated"): True
-            },
+            identity_map=identity_map,
+            where_clauses=activated if where_clauses is None else activated & where_clauses,
             order_by_columns=[ColumnDC(table_name=cls.Meta.tablename, column_name="order_by")],
         )
 
     class Meta(Table.Meta):
         tablename = "question"
+        unique_constraints = [("name",)]
+        updated_at_column = "updated_at"
 
     class ForeignKeys(Table.ForeignKeys):
         # TYPE_ID = ForeignKey(QuestionTypeDB, "type_id", "pk")
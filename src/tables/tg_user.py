@@ -9,5 +9,6 @@ from src.orm.dataclasses import (
 class TgUserDB(Table):
     user_id: int
 
-    class Meta:
+    class Meta(Table.Meta):
         tablename = "tg_user"
+        primary_key = "user_id"
@@ -1,11 +1,37 @@
+import bisect
+import concurrent.futures
 import dataclasses
 import datetime
+import functools
+import os
+import threading
+import weakref
 from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Type,
+    TypeVar,
+)
 
+import numpy as np
 import pandas as pd
 import telegram
 
+from src.orm.base import In
+from src.orm.dataclasses import (
+    Table,
+)
+from src.orm.identity_map import (
+    IdentityMap,
+)
+from src.orm.notify import (
+    ALL_TABLES,
+    TableChangeDC,
+)
 from src.tables.answer import (
+    FK_NAMES_ONLY,
     AnswerDB,
     AnswerType,
 )
@@ -20,6 +46,16 @@ from src.utils import (
     get_today,
 )
 
+ResultT = TypeVar("ResultT")
+
+# Key of `UserDBCacheRegistry` cache, shared by all users
+SHARED_CACHE_KEY = "shared"
+
+# `UserDBCache.refresh` re-checks rows changed this long before the last seen change
+CACHE_REFRESH_OVERLAP = datetime.timedelta(
+    seconds=float(os.environ.get("CACHE_REFRESH_OVERLAP_SEC", "5"))
+)
+
 
 @dataclass
 class ConversationsStorage:
@@ -63,29 +99,686 @@ class ASKEventConvStorage(ASKConversationStorage):
     event_text: str | None = None
 
 
+@dataclass
+class UpdatedAtMarkDC:
+    """
+    High-water mark of rows of table, seen by `UserDBCache`
+    """
+
+    # Max `updated_at` of seen rows
+    updated_at: datetime.datetime | None = None
+    # (pk, updated_at) of seen rows, changed within `CACHE_REFRESH_OVERLAP` before @updated_at
+    recent: set[tuple[int, datetime.datetime]] = dataclasses.field(default_factory=set)
+
+    @classmethod
+    def of(
+        cls,
+        versions: list[tuple[int, datetime.datetime]],
+        default: datetime.datetime | None = None,
+    ) -> "UpdatedAtMarkDC":
+        """
+        @param versions: (pk, updated_at) of seen rows
+        @param default: Mark, if there are no @versions
+        """
+        updated_at = max((x for _, x in versions), default=default)
+        if updated_at is None:
+            return cls()
+
+        return cls(
+            updated_at=updated_at,
+            recent={x for x in versions if x[1] > updated_at - CACHE_REFRESH_OVERLAP},
+        )
+
+
+class AnswersTimeIndex:
+    """
+    Answers having time, sorted by timestamp (ties - by pk, as in `AnswerDB.sort_key`),
+        with timestamps precomputed: answers within time range are found by bisect in O(log n + k)
+    """
+
+    def __init__(self):
+        self.answers: list[AnswerDB] = []
+        self.timestamps: list[datetime.datetime] = []
+
+    def add(self, answer: AnswerDB, is_append: bool = False) -> None:
+        """
+        @param is_append: @answer goes after all added ones, no need to search its place
+        """
+        if is_append:
+            i = len(self.answers)
+        else:
+            i = bisect.bisect_right(self.answers, answer.sort_key(), key=AnswerDB.sort_key)
+
+        self.answers.insert(i, answer)
+        self.timestamps.insert(i, answer.get_timestamp())
+
+    def remove(self, answer: AnswerDB) -> None:
+        i = bisect.bisect_left(self.answers, answer.sort_key(), key=AnswerDB.sort_key)
+
+        if i < len(self.answers) and self.answers[i] is answer:
+            del self.answers[i]
+            del self.timestamps[i]
+
+    def between(self, start: datetime.datetime, end: datetime.datetime) -> list[AnswerDB]:
+        """
+        Answers with `start < timestamp < end` (both bounds are exclusive), in timestamp order
+        """
+        lo = bisect.bisect_right(self.timestamps, start)
+        hi = bisect.bisect_left(self.timestamps, end, lo=lo)
+
+        return self.answers[lo:hi]
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+
+class AnsweredQuestionsMatrix:
+    """
+    Days x questions boolean matrix: whether question was answered (with text) on day,
+        so unanswered questions of day, days missing question, completeness are found by vector ops.
+
+    Columns are questions in order they're given (`UserDBCache.questions`), so column index is question index.
+    Rows are days, in order of first answer on them. Rows storage grows by doubling, as answers are added.
+    """
+
+    def __init__(self, questions_pks: list[int]):
+        self.question_columns: dict[int, int] = {pk: i for i, pk in enumerate(questions_pks)}
+        self.day_rows: dict[datetime.date, int] = {}
+        self.days: list[datetime.date] = []
+
+        # Only first `len(days)` rows are used
+        self._matrix = np.zeros((0, len(questions_pks)), dtype=bool)
+
+    def set(self, day: datetime.date, question_pk: int, is_answered: bool) -> None:
+        column = self.question_columns.get(question_pk)
+        # Question is missing in cache (f.e. deactivated)
+        if column is None:
+            return
+
+        row = self.day_rows.get(day)
+        if row is None:
+            if not is_answered:
+                return
+            row = self._add_day(day)
+
+        self._matrix[row, column] = is_answered
+
+    def _add_day(self, day: datetime.date) -> int:
+        row = len(self.days)
+
+        if row == len(self._matrix):
+            matrix = np.zeros((max(2 * row, 64), self._matrix.shape[1]), dtype=bool)
+            matrix[:row] = self._matrix
+            self._matrix = matrix
+
+        self.day_rows[day] = row
+        self.days.append(day)
+        return row
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Used rows of matrix (a view, must not be modified)
+        """
+        return self._matrix[: len(self.days)]
+
+    def answered_on(self, day: datetime.date) -> np.ndarray:
+        """
+        @return: Boolean vector, by question index
+        """
+        row = self.day_rows.get(day)
+        if row is None:
+            return np.zeros(self._matrix.shape[1], dtype=bool)
+
+        return self._matrix[row].copy()
+
+    def unanswered_on(self, day: datetime.date) -> list[int]:
+        """
+        @return: Indices of questions, not answered on @day
+        """
+        return np.flatnonzero(~self.answered_on(day)).tolist()
+
+    def days_missing(self, question_pk: int) -> list[datetime.date]:
+        """
+        @return: Sorted days, on which some questions were answered, but not question with @question_pk
+        """
+        column = self.question_columns[question_pk]
+        matrix = self.matrix
+
+        rows = np.flatnonzero(matrix.any(axis=1) & ~matrix[:, column])
+        return sorted(self.days[i] for i in rows)
+
+    def completeness(self) -> pd.Series:
+        """
+        @return: Share of questions answered, by day (sorted), for days with any question answered
+        """
+        matrix = self.matrix
+        if not matrix.shape[1]:
+            return pd.Series(dtype=float)
+
+        series = pd.Series(matrix.mean(axis=1), index=self.days)
+        return series[matrix.any(axis=1)].sort_index()
+
+
 class UserDBCache:
     questions: list[QuestionDB] | None = None
     events: list[EventDB] | None = None
     answers: list[AnswerDB] | None = None
 
+    # Answer by its pk
+    answers_by_pk: dict[int, AnswerDB] | None = None
+    # Answers of each day, in `answers` order
+    answers_by_day: dict[datetime.date, list[AnswerDB]] | None = None
+    # Answer on question (by its pk) on day
+    answers_by_day_question: dict[tuple[datetime.date, int], AnswerDB] | None = None
+    # Answers on event (by its pk) on day, in `answers` order
+    answers_by_day_event: dict[tuple[datetime.date, int], list[AnswerDB]] | None = None
+    # Answers having time: all of them, and of each event (by its pk)
+    answers_by_time: AnswersTimeIndex | None = None
+    answers_by_event_time: dict[int, AnswersTimeIndex] | None = None
+    # Whether question was answered on day (columns are in `questions` order)
+    answered_questions: AnsweredQuestionsMatrix | None = None
     question_answers_days_set: set[datetime.date] | None = set()
 
+    # Attributes derived from `answers` (see `_update_answers_indexes`)
+    _INDEXES = (
+        "answers_by_pk",
+        "answers_by_day",
+        "answers_by_day_question",
+        "answers_by_day_event",
+        "answers_by_time",
+        "answers_by_event_time",
+        "answered_questions",
+        "question_answers_days_set",
+    )
+
     LAST_RELOAD_TIME: datetime.datetime | None = None
+    LAST_CHANGE_TIME: datetime.datetime | None = None
+
+    # Bumped on every change of cached data, values derived from it are memoized against it (see `memoized`)
+    data_version: int = 0
+
+    # Max `updated_at` of rows, seen by `reload_all` / `refresh`, by tablename
+    updated_at_marks: dict[str, "UpdatedAtMarkDC"] | None = None
 
     def __init__(self):
+        self._init_runtime()
+
         if not self.questions or not self.answers:
             self.reload_all()
 
+    def _init_runtime(self) -> None:
+        """
+        State, which is not pickled (see `__getstate__`)
+        """
+        # Questions & events objects are shared by cache lists & answers referencing them
+        self.identity_map = IdentityMap()
+        # Cache is modified by handlers (`reload_all`) and by DB changes listener (`apply_changes`)
+        self._lock = threading.RLock()
+        # <key>: value, derived from data of current `data_version`
+        self._derived: dict[Hashable, Any] = {}
+
+        _live_caches.add(self)
+
+    @classmethod
+    def from_rows(
+        cls, questions: list[QuestionDB], events: list[EventDB], answers: list[AnswerDB]
+    ) -> "UserDBCache":
+        """
+        Cache of given rows, instead of ones selected from DB (f.e. generated ones, in tests & benchmarks).
+        Rows are added to identity map, as if they were selected, and are set by the same `_set_rows`
+            as in `reload_all`, so cache state is the same as if it was loaded from DB.
+
+        @param questions, events: In `select_all` order
+        @param answers: In `AnswerDB.select_all` order (see `AnswerDB.sort_key`), with foreign keys values set
+        """
+        cache: UserDBCache = cls.__new__(cls)
+        cache._init_runtime()
+
+        with cache._lock:
+            for obj in (*questions, *events, *answers):
+                cache.identity_map.add(obj)
+
+            cache._set_rows(list(questions), list(events), list(answers))
+
+        return cache
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["identity_map"], state["_lock"], state["_derived"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]):
+        self.__dict__.update(state)
+
+        # Unpickled objects are not shared with anyone, so map starts empty
+        self._init_runtime()
+
+        if self.answers is not None and self.answers_by_pk is None:
+            self._update_answers_indexes()
+
     def reload_all(self):
-        self.LAST_RELOAD_TIME = get_now()
+        with self._lock:
+            self.LAST_RELOAD_TIME = get_now()
+
+            # Everything is reloaded, so previously selected objects may be stale
+            self.identity_map.clear()
+
+            questions = QuestionDB.select_all(identity_map=self.identity_map)
+            events = EventDB.select_all(identity_map=self.identity_map)
+            answers = AnswerDB.select_all(identity_map=self.identity_map, only=FK_NAMES_ONLY)
+
+            self._set_rows(questions, events, answers)
+
+    def _set_rows(
+        self, questions: list[QuestionDB], events: list[EventDB], answers: list[AnswerDB]
+    ) -> None:
+        """
+        Replaces all of cached rows (with indexes & `updated_at_marks`) at once
+        """
+        self._update_answers_indexes(
+            questions=questions,
+            events=events,
+            answers=answers,
+            updated_at_marks={
+                class_.Meta.tablename: UpdatedAtMarkDC.of([(x.pk, x.updated_at) for x in rows])
+                for class_, rows in (
+                    (QuestionDB, questions),
+                    (EventDB, events),
+                    (AnswerDB, answers),
+                )
+            },
+        )
+        self._bump_version()
+
+    def refresh(self):
+        """
+        Cheap alternative of `reload_all`: applies rows changed since the last `reload_all` / `refresh`
+            (found by `updated_at` column, above per-table high-water marks), other objects are kept.
+
+        Rows are searched a bit before the mark (`CACHE_REFRESH_OVERLAP`), as transaction may commit
+            a row with `updated_at` lower than of rows already seen (those already seen are skipped).
+            Deleted rows are found as cached primary keys, missing in table.
+        """
+        with self._lock:
+            if self.updated_at_marks is None:
+                self.reload_all()
+                return
+
+            changed_pks: dict[str, set[int]] = {}
+
+            cached_pks: dict[Type[Table], set[int]] = {
+                QuestionDB: {x.pk for x in self.questions},
+                EventDB: {x.pk for x in self.events},
+                AnswerDB: set(self.answers_by_pk),
+            }
+
+            for class_ in QuestionDB, EventDB, AnswerDB:
+                tablename = class_.Meta.tablename
+                mark = self.updated_at_marks[tablename]
 
-        self.questions = QuestionDB.select_all()
-        self.events = EventDB.select_all()
-        self.answers = AnswerDB.select_all()
+                changed = class_.select_changed_since(
+                    mark.updated_at - CACHE_REFRESH_OVERLAP if mark.updated_at else None
+                )
+
+                changed_pks[tablename] = {
+                    pk for pk, updated_at in changed if (pk, updated_at) not in mark.recent
+                }
+                changed_pks[tablename] |= cached_pks[class_] - set(class_.select_pks())
+                self.updated_at_marks[tablename] = UpdatedAtMarkDC.of(
+                    changed, default=mark.updated_at
+                )
+
+            self._apply_changed_pks(
+                questions_pks=changed_pks[QuestionDB.Meta.tablename],
+                events_pks=changed_pks[EventDB.Meta.tablename],
+                answers_pks=changed_pks[AnswerDB.Meta.tablename],
+            )
+
+    def apply_changes(self, changes: list[TableChangeDC]) -> None:
+        """
+        Updates cache in place by DB changes notifications (see `orm/notify.py`).
+        Falls back to `refresh`, if it's unknown which rows were changed
+            (too many rows changed, or notifications were lost while listener was disconnected).
+        """
+        changed_pks: dict[str, set[int]] = {}
+
+        for change in changes:
+            if change.tablename == ALL_TABLES or change.pks is None:
+                self.refresh()
+                return
+
+            changed_pks.setdefault(change.tablename, set()).update(change.pks)
+
+        with self._lock:
+            self._apply_changed_pks(
+                questions_pks=changed_pks.get(QuestionDB.Meta.tablename, set()),
+                events_pks=changed_pks.get(EventDB.Meta.tablename, set()),
+                answers_pks=changed_pks.get(AnswerDB.Meta.tablename, set()),
+            )
+
+    def _apply_changed_pks(
+        self, questions_pks: set[int], events_pks: set[int], answers_pks: set[int]
+    ) -> None:
+        """
+        Changed rows are re-selected by primary keys (deleted / deactivated ones are dropped),
+            all other objects are kept.
+        Answers are applied to indexes one by one, skipping ones, which cache already has the same version of
+            (f.e. written through by `add_answers`): no indexes are rebuilt, unless questions are changed.
+        """
+        if not questions_pks and not events_pks and not answers_pks:
+            return
+
+        questions, events = self.questions, self.events
+        if questions_pks:
+            questions = self._reselect(QuestionDB, questions, questions_pks, QuestionDB.select_all)
+        if events_pks:
+            events = self._reselect(EventDB, events, events_pks, EventDB.select_all)
+
+        # Answers hold objects of questions & events they refer to, so they're re-selected as well
+        fk_changed_pks: set[int] = set()
+        if questions_pks or events_pks:
+            fk_changed_pks = {
+                a.pk
+                for a in self.answers
+                if a.question_fk in questions_pks or a.event_fk in events_pks
+            }
+
+        is_answers_changed = self._apply_changed_answers(
+            answers_pks | fk_changed_pks, forced_pks=fk_changed_pks
+        )
+
+        if questions_pks:
+            # Questions are columns of matrix, so they're set at once
+            self.__dict__.update(
+                questions=questions,
+                events=events,
+                answered_questions=self._build_answered_questions(questions),
+            )
+        elif events_pks:
+            self.events = events
+
+        if questions_pks or events_pks or is_answers_changed:
+            self.LAST_CHANGE_TIME = get_now()
+            self._bump_version()
+
+    def _apply_changed_answers(self, pks: set[int], forced_pks: set[int]) -> bool:
+        """
+        Re-selects answers with @pks, and puts them into cache in place of cached ones
+
+        @param forced_pks: Answers to replace, even if they're not changed themselves
+            (f.e. question they refer to is changed)
+
+        @return: Whether any answer was changed
+        """
+        if not pks:
+            return False
+
+        for pk in pks:
+            self.identity_map.invalidate(AnswerDB, pk)
+
+        fresh: dict[int, AnswerDB] = {
+            x.pk: x
+            for x in AnswerDB.select_all(
+                where_clauses=In(AnswerDB.column("pk"), tuple(pks)),
+                identity_map=self.identity_map,
+                only=FK_NAMES_ONLY,
+            )
+        }
+
+        is_changed = False
+        for pk in sorted(pks):
+            cached = self.answers_by_pk.get(pk)
+            answer = fresh.get(pk)
+
+            if answer is None:
+                if cached is not None:
+                    self._remove_answer(cached)
+                    is_changed = True
+            elif (
+                cached is not None
+                and pk not in forced_pks
+                and cached.updated_at == answer.updated_at
+            ):
+                # Already applied (f.e. notification of own write), cached object is kept
+                self.identity_map.add(cached)
+            else:
+                self._put_answer(answer)
+                is_changed = True
+
+        return is_changed
+
+    def _reselect(
+        self,
+        class_: Type[Table],
+        rows: list,
+        pks: set[int],
+        select_func: Callable[..., list],
+        sort_key: Callable[[Any], Any] = lambda x: x.order_by,
+    ) -> list:
+        """
+        @param select_func: `select_all` of @class_, rows of which are cached in @rows
+
+        @return: New list of @rows, where rows with @pks are replaced by their current version
+        """
+        for pk in pks:
+            self.identity_map.invalidate(class_, pk)
 
-        self.question_answers_days_set = set(
-            map(lambda a: a.date, filter(lambda x: x.question is not None, self.answers))
+        fresh = select_func(
+            where_clauses=In(class_.column("pk"), tuple(pks)), identity_map=self.identity_map
         )
+        kept = [x for x in rows if x.pk not in pks]
+
+        # Kept rows are already sorted, so it's a merge of sorted runs
+        return sorted(kept + fresh, key=sort_key)
+
+    def _init_answers_indexes(self) -> None:
+        self.answers_by_pk = {}
+        self.answers_by_day = {}
+        self.answers_by_day_question = {}
+        self.answers_by_day_event = {}
+        self.answers_by_time = AnswersTimeIndex()
+        self.answers_by_event_time = {}
+        self.answered_questions = AnsweredQuestionsMatrix([x.pk for x in self.questions])
+        self.question_answers_days_set = set()
+
+    def _update_answers_indexes(self, **data: Any) -> None:
+        """
+        Rebuilds all indexes of `answers`.
+        Indexes are built aside, and are set by a single update of `__dict__`:
+            readers (not taking the lock) see either old or new indexes, never half-built ones.
+
+        @param data: Attributes to set at once with indexes (f.e. new `answers`, indexes are built of)
+        """
+        built: UserDBCache = UserDBCache.__new__(UserDBCache)
+        built.__dict__.update(self.__dict__)
+        built.__dict__.update(data)
+        built._init_answers_indexes()
+
+        # Answers are sorted, so appending them keeps indexes lists sorted too
+        for answer in built.answers:
+            built._index_answer(answer, is_append=True)
+
+        self.__dict__.update({name: built.__dict__[name] for name in (*data, *self._INDEXES)})
+
+    def _build_answered_questions(self, questions: list[QuestionDB]) -> AnsweredQuestionsMatrix:
+        """
+        Matrix for (changed) @questions, from cached answers
+        """
+        answered_questions = AnsweredQuestionsMatrix([x.pk for x in questions])
+
+        for (day, question_pk), answer in self.answers_by_day_question.items():
+            answered_questions.set(day, question_pk, answer.text is not None)
+
+        return answered_questions
+
+    def add_answers(self, answers: list[AnswerDB]) -> None:
+        """
+        Write-through: puts just written answers (as returned by `AnswerDB.insert` / `update_or_insert_many`)
+            into cache, without re-reading DB. Answers overwritten by them (with the same pk) are replaced.
+        Foreign keys objects of answers are set from cached questions & events.
+        """
+        with self._lock:
+            for answer in answers:
+                self._resolve_fk_values(answer)
+                self._put_answer(answer)
+
+                # Not to be re-selected by `refresh`
+                mark = (self.updated_at_marks or {}).get(AnswerDB.Meta.tablename)
+                if mark is not None:
+                    mark.recent.add((answer.pk, answer.updated_at))
+
+            self.LAST_CHANGE_TIME = get_now()
+            self._bump_version()
+
+    def _resolve_fk_values(self, answer: AnswerDB) -> None:
+        for fkey, fk_pk in (
+            (AnswerType.QUESTION.value, answer.question_fk),
+            (AnswerType.EVENT.value, answer.event_fk),
+        ):
+            if fk_pk is not None:
+                answer.set_fk_value(fkey, self.identity_map.get(fkey.class_, fk_pk))
+
+    def _put_answer(self, answer: AnswerDB) -> None:
+        """
+        Inserts @answer, replacing cached answer with the same pk, if any.
+        New answer is indexed before the old one is unindexed, so readers (not taking the lock)
+            don't see a moment, when there is no answer at all.
+        """
+        old = self.answers_by_pk.get(answer.pk)
+
+        # After the old one, if they're of the same key
+        self.answers.insert(
+            bisect.bisect_right(self.answers, answer.sort_key(), key=AnswerDB.sort_key), answer
+        )
+        self._index_answer(answer)
+
+        if old is not None:
+            self._remove_answer(old)
+
+    def _remove_answer(self, answer: AnswerDB) -> None:
+        self._unindex_answer(answer)
+
+        i = bisect.bisect_left(self.answers, answer.sort_key(), key=AnswerDB.sort_key)
+        if i < len(self.answers) and self.answers[i] is answer:
+            del self.answers[i]
+
+    def _index_answer(self, answer: AnswerDB, is_append: bool = False) -> None:
+        """
+        @param is_append: @answer goes after all indexed ones (in `answers` order), no need to search its place
+        """
+
+        def add(answers: list[AnswerDB]):
+            if is_append:
+                answers.append(answer)
+            else:
+                bisect.insort_right(answers, answer, key=AnswerDB.sort_key)
+
+        self.answers_by_pk[answer.pk] = answer
+        add(self.answers_by_day.setdefault(answer.date, []))
+
+        if answer.question_fk is not None:
+            self.answers_by_day_question[(answer.date, answer.question_fk)] = answer
+            self.answered_questions.set(answer.date, answer.question_fk, answer.text is not None)
+        if answer.question is not None:
+            self.question_answers_days_set.add(answer.date)
+        if answer.event_fk is not None:
+            add(self.answers_by_day_event.setdefault((answer.date, answer.event_fk), []))
+
+        if answer.time is not None:
+            self.answers_by_time.add(answer, is_append)
+
+            if answer.event_fk is not None:
+                event_index = self.answers_by_event_time.get(answer.event_fk)
+                if event_index is None:
+                    event_index = self.answers_by_event_time[answer.event_fk] = AnswersTimeIndex()
+
+                event_index.add(answer, is_append)
+
+    def _unindex_answer(self, answer: AnswerDB) -> None:
+        """
+        Keys, already pointing to the new version of @answer (see `_put_answer`), are kept
+        """
+        # Emptied keys are removed, as if indexes were built by `reload_all`
+        day_answers = self.answers_by_day[answer.date]
+        day_answers.remove(answer)
+        if not day_answers:
+            del self.answers_by_day[answer.date]
+
+        # Last answer on question of the day
+        if answer.question is not None and all(x.question is None for x in day_answers):
+            self.question_answers_days_set.discard(answer.date)
+
+        if self.answers_by_pk.get(answer.pk) is answer:
+            del self.answers_by_pk[answer.pk]
+
+        question_key = (answer.date, answer.question_fk)
+        if (
+            answer.question_fk is not None
+            and self.answers_by_day_question.get(question_key) is answer
+        ):
+            del self.answers_by_day_question[question_key]
+            self.answered_questions.set(answer.date, answer.question_fk, False)
+        if answer.event_fk is not None:
+            event_key = (answer.date, answer.event_fk)
+            self.answers_by_day_event[event_key].remove(answer)
+            if not self.answers_by_day_event[event_key]:
+                del self.answers_by_day_event[event_key]
+
+        if answer.time is not None:
+            self.answers_by_time.remove(answer)
+
+            if answer.event_fk is not None:
+                self.answers_by_event_time[answer.event_fk].remove(answer)
+
+    def question_answer_on(self, day: datetime.date, question_pk: int) -> AnswerDB | None:
+        return self.answers_by_day_question.get((day, question_pk))
+
+    def event_answers_on(self, day: datetime.date, event_pk: int) -> list[AnswerDB]:
+        return self.answers_by_day_event.get((day, event_pk), [])
+
+    def unanswered_questions_indices(self, day: datetime.date) -> list[int]:
+        """
+        @return: Indices (in `questions`) of questions, not answered on @day (or answered without text)
+        """
+        return self.answered_questions.unanswered_on(day)
+
+    def answers_between(
+        self, start: datetime.datetime, end: datetime.datetime, event_pk: int | None = None
+    ) -> list[AnswerDB]:
+        """
+        Answers with `start < timestamp < end`, in timestamp order (see `AnswersTimeIndex.between`)
+
+        @param event_pk: Only answers on this event
+        """
+        if event_pk is None:
+            return self.answers_by_time.between(start, end)
+
+        event_index = self.answers_by_event_time.get(event_pk)
+        return event_index.between(start, end) if event_index is not None else []
+
+    def _bump_version(self) -> None:
+        self.data_version += 1
+        self._derived = {}
+
+    def memoized(self, key: Hashable, build: Callable[[], ResultT]) -> ResultT:
+        """
+        Value derived from cached data (f.e. DataFrame), built by @build once per `data_version`.
+        Value is shared by all callers, and must not be modified.
+        """
+        with self._lock:
+            version = self.data_version
+            if key in self._derived:
+                return self._derived[key]
+
+        value = build()
+
+        with self._lock:
+            # Not to keep value built from data, changed meanwhile
+            if self.data_version == version:
+                self._derived[key] = value
+
+        return value
 
     def questions_names(self) -> list[str]:
         return list(map(lambda x: x.name, self.questions))
@@ -94,37 +787,61 @@ class UserDBCache:
         return list(map(lambda x: x.name, self.events))
 
     def questions_answers_df(self, include_empty_cols=False) -> pd.DataFrame | None:
+        return self.memoized(
+            ("questions_answers_df", include_empty_cols),
+            functools.partial(self._build_questions_answers_df, include_empty_cols),
+        )
+
+    def _build_questions_answers_df(self, include_empty_cols: bool) -> pd.DataFrame | None:
+        """
+        Pivot of questions answers: row per (cached) question, column per day, cells are answers texts.
+        Built at once from arrays of (question index, day index, text), instead of column by column.
+
+        @param include_empty_cols: Keep days, on which all answers have no text
+        """
         index = self.questions_names()
+        question_indices: dict[str, int] = {name: i for i, name in enumerate(index)}
 
-        df = pd.DataFrame(index=index)
+        # Days in order of first answer on them
+        day_indices: dict[datetime.date, int] = {}
 
-        # <day (date)> : tuple(<question_name>, <answer_text>)
-        day_answers_mapping: dict[datetime.date, list[tuple[str, str]]] = {}
+        answers_question_i: list[int] = []
+        answers_day_i: list[int] = []
+        answers_texts: list[str | None] = []
 
         for answer in self.answers:
             # One of QuestionDB / EventDB
+            question = answer.question
+            if not question:
+                continue
 
-            if answer.question:
-                if not day_answers_mapping.get(answer.date, None):
-                    day_answers_mapping[answer.date] = []
-
-                answer_text = answer.text
-                day_answers_mapping[answer.date].append((answer.question.name, answer_text))
+            # Answers to questions missing in cache (f.e. deactivated) only count for empty days check
+            answers_question_i.append(question_indices.get(question.name, -1))
+            answers_day_i.append(day_indices.setdefault(answer.date, len(day_indices)))
+            answers_texts.append(answer.text)
 
-        if not day_answers_mapping:
+        if not day_indices:
             return None
 
-        for day in day_answers_mapping:
-            qnames_and_texts = day_answers_mapping[day]
-            day_col = pd.DataFrame(qnames_and_texts).set_index(0)
+        question_i = np.array(answers_question_i, dtype=np.intp)
+        day_i = np.array(answers_day_i, dtype=np.intp)
+        texts = np.array(answers_texts, dtype=object)
 
-            if not include_empty_cols:
-                if day_col.isnull().all().bool():
-                    continue
+        values = np.full((len(index), len(day_indices)), np.nan, dtype=object)
+        is_known = question_i >= 0
+        values[question_i[is_known], day_i[is_known]] = texts[is_known]
 
-            df[day] = day_col
+        days = np.empty(len(day_indices), dtype=object)
+        days[:] = list(day_indices)
 
-        return df
+        if not include_empty_cols:
+            texts_per_day = np.bincount(day_i, weights=~pd.isnull(texts), minlength=len(days))
+            is_kept_day = texts_per_day > 0
+
+            values = values[:, is_kept_day]
+            days = days[is_kept_day]
+
+        return pd.DataFrame(values, index=index, columns=days)
 
     def events_answers_df(self) -> pd.DataFrame | None:
         """
@@ -133,11 +850,16 @@ class UserDBCache:
             Index   | Value
             <time>  | tuple(<event.name>, <answer_text>)
         """
+        today = get_today()
+        return self.memoized(
+            ("events_answers_df", today), functools.partial(self._build_events_answers_df, today)
+        )
 
-        def filter_answers(a: AnswerDB) -> bool:
-            return a.event is not None and a.date == get_today()
-
-        event_answers = sorted(filter(filter_answers, self.answers), key=lambda x: x.time)
+    def _build_events_answers_df(self, today: datetime.date) -> pd.DataFrame | None:
+        event_answers = sorted(
+            filter(lambda a: a.event is not None, self.answers_by_day.get(today, [])),
+            key=lambda x: x.time,
+        )
 
         row_list = list(map(lambda x: [x.time, x.event.name, x.text], event_answers))
 
@@ -161,31 +883,194 @@ class UserDBCache:
         return answers_df
 
 
+# Live caches, updated in place by DB changes notifications (see `on_db_changes`)
+_live_caches: "weakref.WeakSet[UserDBCache]" = weakref.WeakSet()
+
+
+def on_db_changes(changes: list[TableChangeDC]) -> None:
+    """
+    Handler of `orm.notify.change_listener`
+    """
+    for cache in list(_live_caches):
+        cache.apply_changes(changes)
+
+
+class UserDBCacheRegistry:
+    """
+    Process-wide caches, shared by all chats (see `UserDBCacheHandle`).
+    Cache is created on the first `acquire`, and dropped once the last handle releases it.
+
+    Cached rows are not filtered by user (answers have no user column yet), so a cache per user
+        would be a full copy of DB each: all users share one cache (see `cache_key`),
+        until rows can be selected per user.
+    """
+
+    def __init__(self):
+        self.caches: dict[Hashable, UserDBCache] = {}
+        self.refcounts: dict[Hashable, int] = {}
+
+        # Caches being loaded from DB, waited for by concurrent `acquire` of the same key
+        self._loading: dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(user_id: int) -> Hashable:
+        # pylint: disable=unused-argument
+        return SHARED_CACHE_KEY
+
+    def acquire(self, user_id: int) -> UserDBCache:
+        """
+        Blocking DB load happens out of the lock: only callers of the same cache wait for it
+        """
+        key = self.cache_key(user_id)
+
+        with self._lock:
+            self.refcounts[key] = self.refcounts.get(key, 0) + 1
+
+            cache = self.caches.get(key)
+            if cache is not None:
+                return cache
+
+            future = self._loading.get(key)
+            is_loader = future is None
+            if is_loader:
+                future = self._loading[key] = concurrent.futures.Future()
+
+        if not is_loader:
+            try:
+                return future.result()
+            except BaseException:
+                self.release(user_id)
+                raise
+
+        try:
+            cache = UserDBCache()
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[key]
+
+            self.release(user_id)
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._loading[key]
+            # Not kept, if everyone released it meanwhile
+            if self.refcounts.get(key):
+                self.caches[key] = cache
+
+        future.set_result(cache)
+        return cache
+
+    def release(self, user_id: int) -> None:
+        key = self.cache_key(user_id)
+
+        with self._lock:
+            refcount = self.refcounts.get(key, 0) - 1
+
+            if refcount > 0:
+                self.refcounts[key] = refcount
+            else:
+                self.refcounts.pop(key, None)
+                self.caches.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.caches)
+
+
+db_cache_registry = UserDBCacheRegistry()
+
+
+class UserDBCacheHandle:
+    """
+    Chat's reference to cache of user in registry (see `UserDBCacheRegistry.cache_key`).
+    Released on `release()`, or once handle is garbage collected (f.e. chat data is dropped).
+
+    Pickled as user id only: cache itself is not persisted, and is acquired again on first access.
+    """
+
+    def __init__(self, user_id: int, registry: UserDBCacheRegistry = db_cache_registry):
+        self.user_id = user_id
+        self.registry = registry
+
+        self._cache: UserDBCache | None = None
+        self._finalizer: weakref.finalize | None = None
+
+    @property
+    def cache(self) -> UserDBCache:
+        """
+        May load cache from DB (on first access to user's cache in process), so in async code
+            should be first accessed in a thread (see `handler_decorator`)
+        """
+        if self._cache is None:
+            self._cache = self.registry.acquire(self.user_id)
+            self._finalizer = weakref.finalize(self, self.registry.release, self.user_id)
+
+        return self._cache
+
+    @property
+    def is_acquired(self) -> bool:
+        return self._cache is not None
+
+    def release(self) -> None:
+        if self._finalizer is not None:
+            # Calls `registry.release` (only once, even if called again on garbage collection)
+            self._finalizer()
+
+        self._cache = None
+        self._finalizer = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"user_id": self.user_id}
+
+    def __setstate__(self, state: dict[str, Any]):
+        self.__init__(state["user_id"])
+
+
 class UserData:
     conv_storage: ASKConversationStorage
-    db_cache: UserDBCache
+    db_cache_handle: UserDBCacheHandle | None = None
 
     DEBUG_SQL_OUTPUT = False
     DEBUG_ERRORS_OUTPUT = True
 
     def __init__(self):
         self.conv_storage = ASKConversationStorage()
-        self.db_cache = UserDBCache()
+
+    def __setstate__(self, state: dict[str, Any]):
+        # Chat data, persisted before caches were shared, holds its own copy of cache
+        state.pop("db_cache", None)
+        self.__dict__.update(state)
+
+    def bind_user(self, user_id: int) -> UserDBCache:
+        """
+        Points chat to the shared cache of @user_id (releasing cache of another user, if bound to one)
+        """
+        if self.db_cache_handle is None or self.db_cache_handle.user_id != user_id:
+            if self.db_cache_handle is not None:
+                self.db_cache_handle.release()
+
+            self.db_cache_handle = UserDBCacheHandle(user_id)
+
+        return self.db_cache_handle.cache
+
+    @property
+    def db_cache(self) -> UserDBCache:
+        if self.db_cache_handle is None:
+            raise Exception("UserData is not bound to user, see `bind_user`")
+
+        return self.db_cache_handle.cache
 
     def cur_question_answer_in_db(self) -> str | None:
         assert isinstance(self.conv_storage, ASKQuestionsConvStorage)
 
         day = self.conv_storage.day
-        question_name = self.conv_storage.current_question(self.db_cache.questions).name
-        answers_df = self.db_cache.questions_answers_df()
-
-        if answers_df is None or day not in answers_df.columns:
-            return None
+        question = self.conv_storage.current_question(self.db_cache.questions)
 
-        existing_answer = answers_df[day][question_name]
-        if pd.isnull(existing_answer):
+        answer = self.db_cache.question_answer_on(day, question.pk)
+        if answer is None or pd.isnull(answer.text):
             return None
-        return existing_answer
+        return answer.text
 
 
 if __name__ == "__main__":
@@ -1,3 +1,4 @@
+import asyncio
 import re
 import traceback
 from functools import wraps
@@ -65,10 +66,19 @@ def handler_decorator(func):
         # pylint: disable=consider-using-dict-items
         for KEY in CHAT_DATA_KEYS_DEFAULTS:
             if KEY not in context.chat_data or context.chat_data[KEY] is None:
-                context.chat_data[KEY] = CHAT_DATA_KEYS_DEFAULTS[KEY]()
+                # Default constructors may be blocking, so not on event loop
+                context.chat_data[KEY] = await asyncio.to_thread(CHAT_DATA_KEYS_DEFAULTS[KEY])
 
         ud: UserData = context.chat_data[USER_DATA_KEY]
 
+        # Shared cache of user is loaded from DB on its first use in process, so not on event loop
+        handle = ud.db_cache_handle
+        user = update.effective_user
+        if user is not None and (
+            handle is None or handle.user_id != user.id or not handle.is_acquired
+        ):
+            await asyncio.to_thread(ud.bind_user, user.id)
+
         try:
             return await func(update, context, *args, **kwargs)
         except MyException as e:
@@ -0,0 +1,73 @@
+import datetime
+import gc
+
+from src.orm.identity_map import (
+    IdentityMap,
+)
+from src.tables.event import (
+    EventDB,
+)
+from src.tables.question import (
+    QuestionDB,
+)
+
+
+def event(pk: int) -> EventDB:
+    return EventDB(
+        pk=pk,
+        user_id=1,
+        name=f"event {pk}",
+        order_by=str(pk),
+        type="",
+        updated_at=datetime.datetime(2024, 1, 1),
+    )
+
+
+def test_objects_are_found_by_table_and_pk():
+    identity_map = IdentityMap(weak=False)
+    obj = event(1)
+    identity_map.add(obj)
+
+    assert identity_map.get(EventDB, 1) is obj
+    assert identity_map.get(EventDB, 2) is None
+    # Same pk of other table
+    assert identity_map.get(QuestionDB, 1) is None
+
+
+def test_weak_map_evicts_unreferenced_objects():
+    identity_map = IdentityMap()
+    obj = event(1)
+    identity_map.add(obj)
+    assert len(identity_map) == 1
+
+    del obj
+    gc.collect()
+
+    assert identity_map.get(EventDB, 1) is None
+    assert len(identity_map) == 0
+
+
+def test_invalidate_by_pk_and_by_table():
+    identity_map = IdentityMap(weak=False)
+    for pk in (1, 2, 3):
+        identity_map.add(event(pk))
+
+    identity_map.invalidate(EventDB, 2)
+    assert identity_map.get(EventDB, 2) is None
+    assert len(identity_map) == 2
+
+    # Missing object is not an error
+    identity_map.invalidate(EventDB, 2)
+
+    identity_map.invalidate(EventDB)
+    assert len(identity_map) == 0
+
+
+def test_added_object_replaces_stale_one():
+    identity_map = IdentityMap(weak=False)
+    stale, fresh = event(1), event(1)
+
+    identity_map.add(stale)
+    identity_map.add(fresh)
+
+    assert identity_map.get(EventDB, 1) is fresh
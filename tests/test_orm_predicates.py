@@ -0,0 +1,141 @@
+import itertools
+import operator
+
+import pytest
+
+from src.orm.base import (
+    And,
+    CoalesceDC,
+    ColumnDC,
+    Compare,
+    Const,
+    Eq,
+    Ge,
+    Gt,
+    In,
+    IsNull,
+    KeysetAfter,
+    Or,
+    Predicate,
+    RowGt,
+    placeholder_names,
+)
+from src.tables.answer import (
+    AnswerDB,
+)
+from src.tables.question import (
+    QuestionDB,
+)
+
+A, B, PK = ColumnDC("a"), ColumnDC("b"), ColumnDC("pk")
+
+OPERATORS = {"=": operator.eq, "<>": operator.ne, "<": operator.lt, ">": operator.gt}
+
+
+def to_sql(predicate: Predicate) -> str:
+    return predicate.compose(placeholder_names()).as_string(None)
+
+
+def evaluate(predicate: Predicate, row: dict[str, int | None]) -> bool | None:
+    """
+    Predicate on @row by SQL rules: NULL (None) in comparison is unknown, AND / OR are three-valued
+    """
+    if isinstance(predicate, Compare):
+        value = row[predicate.column.column_name]
+        if value is None or predicate.value is None:
+            return None
+        return OPERATORS[predicate.operator](value, predicate.value)
+    if isinstance(predicate, IsNull):
+        return (row[predicate.column.column_name] is None) != predicate.negate
+    if isinstance(predicate, Const):
+        return predicate.value
+    if isinstance(predicate, RowGt):
+        values = tuple(row[c.column_name] for c in predicate.columns)
+        if None in values or None in predicate.values:
+            return None
+        return values > predicate.values
+    if isinstance(predicate, Or):
+        results = [evaluate(p, row) for p in predicate.predicates]
+        return True if True in results else (None if None in results else False)
+    if isinstance(predicate, And):
+        results = [evaluate(p, row) for p in predicate.predicates]
+        return False if False in results else (None if None in results else True)
+
+    raise NotImplementedError(predicate)
+
+
+def null_last_key(row: dict[str, int | None]) -> tuple:
+    # "ORDER BY a, b, pk" of Postgres: NULLs are the largest values
+    return tuple((row[x] is None, row[x] or 0) for x in ("a", "b", "pk"))
+
+
+def test_predicate_compose_and_params():
+    predicate = In(A, [1, 2]) & (Ge(B, 3) | IsNull(PK))
+
+    assert to_sql(predicate) == '("a" = ANY(%(w0)s) AND ("b" >= %(w1)s OR "pk" IS NULL))'
+    assert predicate.params() == [[1, 2], 3]
+
+
+def test_shape_is_the_same_for_different_values():
+    assert (Eq(A, 1) & In(B, [1])).shape() == (Eq(A, 2) & In(B, [3, 4])).shape()
+    assert Eq(A, 1).shape() != Gt(A, 1).shape()
+
+
+def test_from_dict():
+    assert Predicate.from_dict({A: 1}) == Eq(A, 1)
+    assert Predicate.from_dict({A: 1, B: 2}) == And(Eq(A, 1), Eq(B, 2))
+
+
+def test_keyset_of_not_null_columns_is_row_comparison():
+    predicate = KeysetAfter([A, B, PK], (1, 2, 3))
+
+    assert predicate == RowGt((A, B, PK), (1, 2, 3))
+    assert to_sql(predicate) == '("a", "b", "pk") > (%(w0)s, %(w1)s, %(w2)s)'
+    assert predicate.params() == [1, 2, 3]
+
+
+def test_keyset_coalesces_values_of_coalesce_columns():
+    time = CoalesceDC(ColumnDC("time"), "'24:00'::time")
+    predicate = KeysetAfter([A, time, PK], (1, None, 3))
+
+    assert to_sql(predicate) == (
+        '("a", COALESCE("time", \'24:00\'::time), "pk") > '
+        "(%(w0)s, COALESCE(%(w1)s, '24:00'::time), %(w2)s)"
+    )
+    assert predicate.params() == [1, None, 3]
+
+
+def test_keyset_checks_nulls_of_nullable_columns_only():
+    predicate = KeysetAfter([A, B, PK], (1, 2, 3), nullable={B})
+
+    assert to_sql(predicate) == (
+        '("a" > %(w0)s OR ("a" = %(w1)s AND ("b" > %(w2)s OR "b" IS NULL))'
+        ' OR ("a" = %(w3)s AND "b" = %(w4)s AND "pk" > %(w5)s))'
+    )
+
+
+@pytest.mark.parametrize(
+    "values, nullable", [((1, 2), set()), ((1, 2, None), {A, B}), ((None,), {A, B})]
+)
+def test_keyset_selects_rows_following_in_order(values, nullable):
+    rows = [
+        {"a": a, "b": b, "pk": pk}
+        for pk, (a, b) in enumerate(itertools.product(values, repeat=2), start=1)
+    ]
+
+    for after in rows:
+        predicate = KeysetAfter([A, B, PK], (after["a"], after["b"], after["pk"]), nullable)
+
+        assert [x for x in rows if evaluate(predicate, x) is True] == [
+            x for x in rows if null_last_key(x) > null_last_key(after)
+        ]
+
+
+def test_table_nullable_columns():
+    # Answers are paged by NOT NULL ones only (time is coalesced), so by index
+    assert not AnswerDB.nullable_columns(AnswerDB._order_by_columns())
+
+    question_name = QuestionDB.column("name")
+    assert AnswerDB.nullable_columns(
+        [AnswerDB.column("time"), AnswerDB.column("pk"), question_name]
+    ) == {AnswerDB.column("time"), question_name}
@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+
+from src.orm import base
+from src.orm.base import ColumnDC
+
+
+@pytest.fixture
+def executed_batches(monkeypatch) -> list:
+    """
+    Batches flushed to DB (no DB is needed: `_query_set_batch` only records them)
+    """
+    batches = []
+
+    def query_set_batch(batch):
+        batches.append(batch)
+        return [[(i, False) for i, _ in enumerate(params_seq)] for _, params_seq in batch]
+
+    monkeypatch.setattr(base, "_query_set_batch", query_set_batch)
+    return batches
+
+
+def upsert_answers() -> list[base.UpsertResultDC] | None:
+    day = datetime.date(2024, 1, 1)
+
+    return base.update_or_insert_rows(
+        "answer",
+        [
+            (
+                {ColumnDC(column_name="date"): day, ColumnDC(column_name="question_fk"): pk},
+                {ColumnDC(column_name="text"): str(pk)},
+            )
+            for pk in (1, 2)
+        ],
+        returning_columns=["pk"],
+    )
+
+
+def test_upsert_rows_without_transaction_is_written_at_once(executed_batches):
+    results = upsert_answers()
+
+    assert len(executed_batches) == 1
+    assert [x.row for x in results] == [(0,), (1,)]
+
+
+def test_upsert_rows_is_deferred_to_transaction(executed_batches):
+    with base.transaction() as tr:
+        assert upsert_answers() is None
+        assert not executed_batches
+
+    assert len(executed_batches) == 1
+    assert len(executed_batches[0][0][1]) == 2
+    assert tr.results == [(0, False), (1, False)]
+
+
+def test_rollback_drops_upsert_rows(executed_batches):
+    with pytest.raises(RuntimeError):
+        with base.transaction():
+            upsert_answers()
+            raise RuntimeError
+
+    assert not executed_batches
+    assert base._current_transaction.get() is None
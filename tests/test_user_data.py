@@ -0,0 +1,376 @@
+import datetime
+import gc
+import threading
+
+import pytest
+
+from src import user_data
+from src.orm.notify import (
+    TableChangeDC,
+)
+from src.tables.answer import (
+    AnswerDB,
+    AnswerType,
+)
+from src.tables.event import (
+    EventDB,
+)
+from src.tables.question import (
+    QuestionDB,
+)
+from src.user_data import (
+    AnsweredQuestionsMatrix,
+    AnswersTimeIndex,
+    UserDBCache,
+    UserDBCacheHandle,
+    UserDBCacheRegistry,
+)
+
+DAY = datetime.date(2024, 1, 1)
+UPDATED_AT = datetime.datetime(2024, 1, 1)
+
+QUESTIONS = [
+    QuestionDB(
+        pk=pk,
+        user_id=1,
+        name=f"question {pk}",
+        fulltext="",
+        choices_list=None,
+        is_activated=True,
+        order_by=pk,
+        type_id=0,
+        updated_at=UPDATED_AT,
+    )
+    for pk in (1, 2, 3)
+]
+EVENTS = [
+    EventDB(pk=pk, user_id=1, name=f"event {pk}", order_by=str(pk), type="", updated_at=UPDATED_AT)
+    for pk in (1, 2)
+]
+
+
+def day(i: int) -> datetime.date:
+    return DAY + datetime.timedelta(days=i)
+
+
+def answer(
+    pk: int,
+    on_day: datetime.date,
+    question_pk: int | None = None,
+    event_pk: int | None = None,
+    time: datetime.time | None = None,
+    text: str | None = "text",
+    updated_at: datetime.datetime = UPDATED_AT,
+) -> AnswerDB:
+    obj = AnswerDB(
+        pk=pk,
+        date=on_day,
+        event_fk=event_pk,
+        question_fk=question_pk,
+        time=time,
+        text=text,
+        updated_at=updated_at,
+    )
+    if question_pk is not None:
+        obj.set_fk_value(AnswerType.QUESTION.value, QUESTIONS[question_pk - 1])
+    if event_pk is not None:
+        obj.set_fk_value(AnswerType.EVENT.value, EVENTS[event_pk - 1])
+    return obj
+
+
+def at(hour: int) -> datetime.time:
+    return datetime.time(hour)
+
+
+def gen_answers() -> list[AnswerDB]:
+    answers = [
+        answer(1, day(0), question_pk=1),
+        answer(2, day(0), question_pk=2, text=None),
+        answer(3, day(0), event_pk=1, time=at(8)),
+        answer(4, day(0), event_pk=1, time=at(20)),
+        answer(5, day(1), question_pk=1),
+        answer(6, day(1), question_pk=3),
+        answer(7, day(1), event_pk=2, time=at(9)),
+        answer(8, day(2), question_pk=2),
+    ]
+    return sorted(answers, key=AnswerDB.sort_key)
+
+
+class FakeAnswersTable:
+    """
+    Rows "in DB", re-selected by `UserDBCache` on changes notifications
+    """
+
+    def __init__(self, answers: list[AnswerDB]):
+        self.rows: dict[int, AnswerDB] = {x.pk: x for x in answers}
+
+    def select_all(self, where_clauses, identity_map=None, only=None) -> list[AnswerDB]:
+        # pylint: disable=unused-argument
+        selected = [self.rows[pk] for pk in where_clauses.values if pk in self.rows]
+        return sorted(selected, key=AnswerDB.sort_key)
+
+    def write(self, cache: UserDBCache, row: AnswerDB) -> None:
+        self.rows[row.pk] = row
+        cache.apply_changes([TableChangeDC(AnswerDB.Meta.tablename, "UPDATE", (row.pk,))])
+
+    def delete(self, cache: UserDBCache, pk: int) -> None:
+        del self.rows[pk]
+        cache.apply_changes([TableChangeDC(AnswerDB.Meta.tablename, "DELETE", (pk,))])
+
+
+@pytest.fixture
+def answers_table(monkeypatch) -> FakeAnswersTable:
+    table = FakeAnswersTable(gen_answers())
+    monkeypatch.setattr(AnswerDB, "select_all", table.select_all)
+    return table
+
+
+@pytest.fixture
+def cache() -> UserDBCache:
+    return UserDBCache.from_rows(QUESTIONS, EVENTS, gen_answers())
+
+
+def pks(answers: list[AnswerDB]) -> list[int]:
+    return [x.pk for x in answers]
+
+
+def indexes_state(cache: UserDBCache) -> dict:
+    """
+    Indexes of @cache, comparable with ones of other cache (regardless of objects identity)
+    """
+    matrix = cache.answered_questions
+
+    return {
+        "answers": pks(cache.answers),
+        "by_pk": {pk: x.pk for pk, x in cache.answers_by_pk.items()},
+        "by_day": {k: pks(v) for k, v in cache.answers_by_day.items()},
+        "by_day_question": {k: x.pk for k, x in cache.answers_by_day_question.items()},
+        "by_day_event": {k: pks(v) for k, v in cache.answers_by_day_event.items()},
+        "by_time": pks(cache.answers_by_time.answers),
+        "by_event_time": {k: pks(v.answers) for k, v in cache.answers_by_event_time.items() if v},
+        "answered": {
+            x: matrix.answered_on(x).tolist() for x in matrix.days if matrix.answered_on(x).any()
+        },
+        "question_days": cache.question_answers_days_set,
+    }
+
+
+def assert_same_as_rebuilt(cache: UserDBCache) -> None:
+    rebuilt = UserDBCache.from_rows(cache.questions, cache.events, list(cache.answers))
+    assert indexes_state(cache) == indexes_state(rebuilt)
+
+
+def test_time_index_range_is_exclusive():
+    index = AnswersTimeIndex()
+    answers = [answer(pk, day(0), event_pk=1, time=at(hour)) for pk, hour in ((1, 10), (2, 8))]
+    answers.append(answer(3, day(0), event_pk=1, time=at(8)))
+    for x in answers:
+        index.add(x)
+
+    # Ties of timestamp are ordered by pk
+    assert pks(index.answers) == [2, 3, 1]
+
+    start = datetime.datetime.combine(day(0), at(8)) - datetime.timedelta(minutes=1)
+    assert pks(index.between(start, start + datetime.timedelta(minutes=1))) == []
+    assert pks(index.between(start, start.replace(hour=11))) == [2, 3, 1]
+
+    index.remove(answers[2])
+    assert pks(index.answers) == [2, 1]
+    assert len(index.timestamps) == 2
+
+
+def test_answered_questions_matrix():
+    matrix = AnsweredQuestionsMatrix([1, 2, 3])
+    matrix.set(day(0), 1, True)
+    matrix.set(day(0), 2, True)
+    matrix.set(day(1), 2, True)
+    # Not answered on a new day: no row for it
+    matrix.set(day(2), 3, False)
+    # Question missing in cache
+    matrix.set(day(1), 4, True)
+
+    assert matrix.days == [day(0), day(1)]
+    assert matrix.unanswered_on(day(0)) == [2]
+    assert matrix.unanswered_on(day(5)) == [0, 1, 2]
+    assert matrix.days_missing(1) == [day(1)]
+    assert matrix.completeness().tolist() == [2 / 3, 1 / 3]
+
+    matrix.set(day(1), 2, False)
+    assert matrix.completeness().index.tolist() == [day(0)]
+
+
+def test_answered_questions_matrix_grows():
+    matrix = AnsweredQuestionsMatrix([1])
+    for i in range(100):
+        matrix.set(day(i), 1, i % 2 == 0)
+
+    assert len(matrix.days) == 50
+    assert matrix.matrix.shape == (50, 1)
+    assert matrix.matrix.all()
+
+
+def test_cache_of_rows(cache):
+    assert cache.question_answer_on(day(1), 3).pk == 6
+    assert pks(cache.event_answers_on(day(0), 1)) == [3, 4]
+    assert cache.unanswered_questions_indices(day(0)) == [1, 2]
+    assert cache.question_answers_days_set == {day(0), day(1), day(2)}
+
+    start = datetime.datetime.combine(day(0), at(7))
+    end = start + datetime.timedelta(days=1, hours=3)
+    assert pks(cache.answers_between(start, end)) == [3, 4, 7]
+    assert pks(cache.answers_between(start, end, event_pk=2)) == [7]
+
+
+def test_add_answers(cache):
+    version = cache.data_version
+
+    cache.add_answers(
+        [answer(9, day(3), question_pk=3), answer(10, day(1), event_pk=1, time=at(7))]
+    )
+
+    assert cache.question_answer_on(day(3), 3).pk == 9
+    # Foreign keys values are set from cached objects
+    assert cache.answers_by_pk[10].event is EVENTS[0]
+    assert cache.data_version > version
+    assert_same_as_rebuilt(cache)
+
+
+def test_added_answer_replaces_one_with_the_same_pk(cache):
+    cache.add_answers([answer(2, day(0), question_pk=2, text="now answered")])
+
+    assert cache.unanswered_questions_indices(day(0)) == [2]
+    assert len(cache.answers) == 8
+    assert_same_as_rebuilt(cache)
+
+
+def test_changed_answer_is_updated(cache, answers_table):
+    answers_table.write(
+        cache, answer(4, day(0), event_pk=1, time=at(6), updated_at=UPDATED_AT.replace(hour=1))
+    )
+
+    assert pks(cache.event_answers_on(day(0), 1)) == [4, 3]
+    assert_same_as_rebuilt(cache)
+
+
+def test_answer_moved_to_other_day(cache, answers_table):
+    answers_table.write(
+        cache, answer(8, day(3), question_pk=2, updated_at=UPDATED_AT.replace(hour=1))
+    )
+
+    assert cache.question_answer_on(day(2), 2) is None
+    assert cache.question_answer_on(day(3), 2).pk == 8
+    assert day(2) not in cache.answers_by_day
+    assert cache.question_answers_days_set == {day(0), day(1), day(3)}
+    assert_same_as_rebuilt(cache)
+
+
+def test_deleted_answers_are_removed(cache, answers_table):
+    for pk in (5, 6, 7):
+        answers_table.delete(cache, pk)
+
+    assert 5 not in cache.answers_by_pk
+    assert cache.question_answers_days_set == {day(0), day(2)}
+    assert cache.unanswered_questions_indices(day(1)) == [0, 1, 2]
+    assert_same_as_rebuilt(cache)
+
+
+def test_notification_of_own_write_is_skipped(cache, answers_table):
+    written = answer(9, day(3), question_pk=3)
+    cache.add_answers([written])
+    version = cache.data_version
+
+    answers_table.write(cache, answer(9, day(3), question_pk=3))
+
+    assert cache.answers_by_pk[9] is written
+    assert cache.data_version == version
+
+
+class TestRegistry:
+    @pytest.fixture
+    def loads(self, monkeypatch) -> list[object]:
+        """
+        Caches "loaded" by registry (no DB is needed: `UserDBCache` is replaced)
+        """
+        loaded: list[object] = []
+
+        def load() -> object:
+            loaded.append(object())
+            return loaded[-1]
+
+        monkeypatch.setattr(user_data, "UserDBCache", load)
+        return loaded
+
+    def test_cache_is_shared_until_last_release(self, loads):
+        registry = UserDBCacheRegistry()
+
+        cache = registry.acquire(1)
+        assert registry.acquire(2) is cache
+        assert len(loads) == 1
+
+        registry.release(1)
+        assert registry.acquire(1) is cache
+
+        registry.release(1)
+        registry.release(2)
+        assert len(registry) == 0
+
+        assert registry.acquire(1) is not cache
+        assert len(loads) == 2
+
+    def test_handle_is_released_once(self, loads):
+        registry = UserDBCacheRegistry()
+        handle, other = UserDBCacheHandle(1, registry), UserDBCacheHandle(1, registry)
+        assert handle.cache is other.cache
+
+        handle.release()
+        handle.release()
+        assert len(registry) == 1
+        assert not handle.is_acquired
+
+        # Released by garbage collection
+        del other
+        gc.collect()
+        assert len(registry) == 0
+        assert len(loads) == 1
+
+    def test_failed_load_is_not_kept(self, monkeypatch):
+        registry = UserDBCacheRegistry()
+
+        def fail():
+            raise RuntimeError("DB is down")
+
+        monkeypatch.setattr(user_data, "UserDBCache", fail)
+        with pytest.raises(RuntimeError):
+            registry.acquire(1)
+
+        assert not registry.refcounts
+        assert not registry._loading
+
+    def test_concurrent_acquire_waits_for_load(self, monkeypatch):
+        registry = UserDBCacheRegistry()
+        is_loading, can_finish = threading.Event(), threading.Event()
+        loaded = object()
+
+        def slow_load():
+            is_loading.set()
+            can_finish.wait(5)
+            return loaded
+
+        monkeypatch.setattr(user_data, "UserDBCache", slow_load)
+
+        results = []
+        loader = threading.Thread(target=lambda: results.append(registry.acquire(1)))
+        loader.start()
+        assert is_loading.wait(5)
+
+        # Lock isn't held by the load
+        waiter = threading.Thread(target=lambda: results.append(registry.acquire(2)))
+        waiter.start()
+        assert len(registry) == 0
+
+        can_finish.set()
+        loader.join(5)
+        waiter.join(5)
+
+        assert results == [loaded, loaded]
+        assert registry.refcounts == {user_data.SHARED_CACHE_KEY: 2}